@@ -5,17 +5,27 @@ from PyQt5.QtWidgets import (
     QLabel, QSlider, QPushButton, QSpinBox, QTableWidget, QTableWidgetItem,
     QAction
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from .filters_dialog import FiltersDialog
 from .build_details_dialog import BuildDetailsDialog
 
-from logic.data_loader import load_specifications
-from logic.data_preprocessor import preprocess_data
+import logging
+import sqlite3
+import time
+
+from logic.settings import EXCEL_PATH, CATALOG_WATCH_INTERVAL, RESULT_STORE_PATH, QUERY_LOG_PATH
+from logic.catalog import Catalog
+from logic.catalog_watcher import CatalogWatcher
+from logic.result_store import ResultStore
+from logic.query_log import QueryRecorder
+from logic.equivalence import collapse_components, expand_builds
 from logic.filters import apply_all_filters
 from logic.component_scoring import score_all_dfs
 from logic.build_combinations import generate_builds, filter_builds_by_price
 from logic.recommendation import *
 
+logger = logging.getLogger(__name__)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -98,16 +108,38 @@ class MainWindow(QMainWindow):
         # Load and preprocess data on startup
         self.load_and_preprocess_data()
         
+        # Rankings computed by earlier sessions (or the service) are reused;
+        # without a usable store every query is simply computed
+        try:
+            self.result_store = ResultStore(RESULT_STORE_PATH)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Result store %s unavailable: %s", RESULT_STORE_PATH, e)
+            self.result_store = None
+        self.query_recorder = QueryRecorder(QUERY_LOG_PATH) if QUERY_LOG_PATH else None
+        
+        # Pick up edits of the workbook while the app is running
+        self.catalog_watcher = CatalogWatcher(EXCEL_PATH)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.timeout.connect(self.reload_changed_sheets)
+        self.watch_timer.start(int(CATALOG_WATCH_INTERVAL * 1000))
+        
         # We'll store filter settings in a dict
         self.gpu_filters = {}
         self.cpu_filters = {}
         self.ram_filters = {}
     
     def load_and_preprocess_data(self):
-        # Load
-        self.gpus, self.cpus, self.rams = load_specifications()
-        # Preprocess
-        self.gpus, self.cpus, self.rams = preprocess_data([self.gpus, self.cpus, self.rams])
+        # Load and preprocess (the catalog keeps the raw sheets for hot reloading)
+        self.catalog = Catalog.from_excel(EXCEL_PATH)
+        self.gpus, self.cpus, self.rams = self.catalog.dfs
+    
+    def reload_changed_sheets(self):
+        # Only the sheets that changed are re-read and only their changed rows re-preprocessed
+        changes = self.catalog_watcher.poll()
+        for component_type, raw_df in changes.items():
+            self.catalog.apply_raw_update(component_type, raw_df)
+        if changes:
+            self.gpus, self.cpus, self.rams = self.catalog.dfs
     
     def open_filters_dialog(self):
         # Open the filters dialog
@@ -117,6 +149,8 @@ class MainWindow(QMainWindow):
             self.gpu_filters, self.cpu_filters, self.ram_filters = dialog.get_filters()
     
     def on_build_clicked(self):
+        start = time.perf_counter()
+        
         # 1. Apply filters
         self.filtered_gpus, self.filtered_cpus, self.filtered_rams = apply_all_filters(
             self.gpus, self.cpus, self.rams,
@@ -130,17 +164,42 @@ class MainWindow(QMainWindow):
         for label_text in self.slider_labels:
             user_weights[label_text] = self.sliders[label_text].value()
         
-        scored_gpus, scored_cpus, scored_rams = score_all_dfs(
-            (self.filtered_gpus, self.filtered_cpus, self.filtered_rams), 
-            user_weights
-        )
-        
-        # 3. Generate all builds
         relevance_matrix = {
             "GPU": {"Gaming":0.5, "ML/AI":0.4, "HPC":0.2, "3D Rendering":0.4},
             "CPU": {"Gaming":0.3, "ML/AI":0.3, "HPC":0.5, "3D Rendering":0.3},
             "RAM": {"Gaming":0.2, "ML/AI":0.3, "HPC":0.3, "3D Rendering":0.3}
         }
+        min_price = self.price_min_spin.value()
+        max_price = self.price_max_spin.value()
+        alpha = 0.6  # or read from another slider
+        query = {
+            "user_weights": user_weights,
+            "gpu_filters": self.gpu_filters,
+            "cpu_filters": self.cpu_filters,
+            "ram_filters": self.ram_filters,
+            "relevance_matrix": relevance_matrix,
+            "min_price": min_price,
+            "max_price": max_price,
+            "alpha": alpha,
+            "group_cols": ["GPU", "CPU"],
+        }
+        
+        # Warm queries skip steps 2-5 entirely
+        self.builds_df = self.result_store.get(self.catalog, query) if self.result_store is not None else None
+        if self.builds_df is not None:
+            # Nothing was collapsed: don't leave the previous query's reduction on display
+            self.statusBar().showMessage("Ranking reused from the result store")
+            self.record_query(query, start)
+            self.show_builds_in_table()
+            return
+        
+        # Interchangeable SKUs are scored and combined once per equivalence class
+        representative_dfs, classes, collapse_report = collapse_components(
+            (self.filtered_gpus, self.filtered_cpus, self.filtered_rams)
+        )
+        scored_gpus, scored_cpus, scored_rams = score_all_dfs(representative_dfs, user_weights)
+        
+        # 3. Generate all builds
         self.builds_df = generate_builds(
             (scored_gpus, scored_cpus, scored_rams),
             user_weights,
@@ -148,18 +207,30 @@ class MainWindow(QMainWindow):
         )
         
         # 4. Price Range Filter
-        min_price = self.price_min_spin.value()
-        max_price = self.price_max_spin.value()
         self.builds_df = filter_builds_by_price(self.builds_df, min_price, max_price)
         
         # 5. Composite Recommendation Score (optional)
-        alpha = 0.6  # or read from another slider
         self.builds_df = compute_composite_recommendation_score(self.builds_df, alpha)
         self.builds_df = filter_top_in_group(self.builds_df, ["GPU", "CPU"], score_col="RecommendationScore")
+        self.builds_df = expand_builds(self.builds_df, classes, ["GPU", "CPU"])
+        if self.result_store is not None:
+            self.result_store.put(self.catalog, query, self.builds_df)
+        self.statusBar().showMessage(
+            f"{collapse_report['builds']} builds evaluated as {collapse_report['collapsed_builds']} "
+            f"(x{collapse_report['reduction_factor']:.1f} fewer)"
+        )
+        
+        self.record_query(query, start)
         
         # 6. Show results in table
         self.show_builds_in_table()
     
+    def record_query(self, query, start):
+        # Opt-in: only when PC_BUILDER_QUERY_LOG is set
+        if self.query_recorder is not None:
+            self.query_recorder.record(query, self.builds_df, time.perf_counter() - start, "gui",
+                                       catalog=self.catalog)
+    
     def show_builds_in_table(self):
         if self.builds_df is None or self.builds_df.empty:
             self.results_table.setRowCount(0)
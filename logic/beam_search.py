@@ -0,0 +1,311 @@
+# beam_search.py
+#
+# Anytime alternative to generate_builds() for catalogs too large to enumerate.
+# The component types are filled in one at a time (GPU, then CPU, then RAM) and
+# after each step only the `beam_width` most promising partial builds are kept,
+# ranked by an optimistic bound on the harmonic mean they can still reach. Passes
+# with a growing beam are run until the time budget is used up or the builds
+# found are provably the best ones. The best builds found come with an upper
+# bound on the best build score in the price window, i.e. on the gap to optimal.
+#
+# Run with:  python -m logic.beam_search   (checks it against generate_builds()
+#                                           on synthetic catalogs)
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+from .filters import apply_all_filters
+from .component_scoring import score_all_dfs
+from .build_combinations import compute_component_weight
+from .pipeline import normalize_query
+
+# Partial builds x components evaluated at once when expanding the beam
+BEAM_CHUNK_ELEMENTS = 2_000_000
+
+
+def _top(values, limit):
+    """
+    Returns the positions of the `limit` largest values, ordered by value and then
+    by position, and the largest value that was left out (-inf if none was).
+    """
+    if len(values) <= limit:
+        return np.lexsort((np.arange(len(values)), -values)), -np.inf
+    threshold = -np.partition(-values, limit - 1)[limit - 1]
+    above = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)
+    chosen = np.concatenate([above, ties[:limit - len(above)]])
+    chosen = chosen[np.lexsort((chosen, -values[chosen]))]
+    if len(ties) > limit - len(above):
+        dropped = threshold
+    else:
+        below = values[values < threshold]
+        dropped = below.max() if len(below) else -np.inf
+    return chosen, dropped
+
+
+def _levels(scored_dfs, user_weights, relevance_matrix, max_price, component_types):
+    # Per component type: the components that can be part of a build with a
+    # nonzero score in the price window, ordered by Task Score per price
+    min_prices = [df["Price"].min() if len(df) else np.inf for df in scored_dfs]
+    levels = []
+    for position, (df, component_type) in enumerate(zip(scored_dfs, component_types)):
+        scores = df["Task Score"].to_numpy(dtype=float)
+        prices = df["Price"].to_numpy(dtype=float)
+        others = sum(price for i, price in enumerate(min_prices) if i != position)
+        rows = np.flatnonzero((scores > 0) & (prices + others <= max_price))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(prices[rows] > 0, scores[rows] / prices[rows], np.inf)
+        rows = rows[np.argsort(-ratio, kind="stable")]
+        weight = compute_component_weight(component_type, user_weights, relevance_matrix)
+        levels.append({
+            "rows": rows,
+            "prices": prices[rows],
+            "terms": weight / scores[rows],
+            # Best (smallest) contribution to the harmonic mean's denominator
+            "best_term": weight / scores[rows].max() if len(rows) else np.inf,
+        })
+    return levels
+
+
+def _beam_pass(levels, numerator, width, min_price, max_price, top_k, deadline):
+    """
+    One beam search pass.
+
+    Returns:
+        tuple: (rows, scores, prices, pruned) for up to top_k complete builds, where
+               rows holds positions into each level's candidates and pruned is the
+               largest bound of any partial build that was dropped; or None if the
+               deadline passed first.
+    """
+    tolerance = 1e-9 * max(1.0, abs(max_price) if np.isfinite(max_price) else 1.0)
+    rest_min = [sum(level["prices"].min() for level in levels[j + 1:]) for j in range(len(levels))]
+    rest_max = [sum(level["prices"].max() for level in levels[j + 1:]) for j in range(len(levels))]
+    rest_term = [sum(level["best_term"] for level in levels[j + 1:]) for j in range(len(levels))]
+
+    rows = np.zeros((1, 0), dtype=np.int64)
+    price = np.zeros(1)
+    denominator = np.zeros(1)
+    pruned = -np.inf
+    for j, level in enumerate(levels):
+        last = j == len(levels) - 1
+        limit = top_k if last else width
+        n = len(level["prices"])
+        chunk = max(1, BEAM_CHUNK_ELEMENTS // max(n, 1))
+        kept_ids = np.zeros(0, dtype=np.int64)
+        kept_values = np.zeros(0)
+        for start in range(0, len(price), chunk):
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            new_price = price[start:start + chunk, None] + level["prices"]
+            new_denominator = denominator[start:start + chunk, None] + level["terms"]
+            if last:
+                feasible = (new_price >= min_price) & (new_price <= max_price)
+                bound_denominator = new_denominator
+            else:
+                feasible = ((new_price + rest_min[j] <= max_price + tolerance) &
+                            (new_price + rest_max[j] >= min_price - tolerance))
+                bound_denominator = new_denominator + rest_term[j]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = np.where(bound_denominator > 0, numerator / bound_denominator, 0.0)
+            # Flat ids (state * n + candidate) grow with the chunks, so ties keep
+            # the order of the states and of the candidates (by Task Score per price)
+            ids = np.concatenate([kept_ids, np.flatnonzero(feasible) + start * n])
+            values = np.concatenate([kept_values, values[feasible]])
+            chosen, dropped = _top(values, limit)
+            if not last:
+                pruned = max(pruned, dropped)
+            kept_ids, kept_values = ids[chosen], values[chosen]
+
+        states, candidates = np.divmod(kept_ids, max(n, 1))
+        rows = np.column_stack([rows[states], candidates])
+        price = price[states] + level["prices"][candidates]
+        denominator = denominator[states] + level["terms"][candidates]
+    return rows, kept_values, price, pruned
+
+
+def beam_search_builds(scored_dfs, user_weights, relevance_matrix=RELEVANCE_MATRIX,
+                       min_price=DEFAULT_MIN_PRICE, max_price=DEFAULT_MAX_PRICE, top_k=10,
+                       beam_width=BEAM_WIDTH, time_budget=BEAM_TIME_BUDGET,
+                       component_types=COMPONENT_TYPES):
+    """
+    Finds the best builds by BuildScore in the price window without enumerating
+    every combination.
+
+    Partial builds are ranked by the harmonic mean they would get if each missing
+    component had the best Task Score of its type, which is never lower than the
+    score of any build completing them; so the largest bound among the pruned
+    partial builds bounds everything the search did not look at. The first pass
+    always runs to completion, later passes (4x wider each) only while time is left.
+
+    Args:
+        scored_dfs (tuple): Scored (gpus, cpus, rams) DataFrames, as for generate_builds().
+        top_k (int): Number of builds to return.
+        beam_width (int): Partial builds kept per component type in the first pass.
+        time_budget (float): Seconds after which no further pass is started (a
+            running pass is abandoned).
+
+    Returns:
+        tuple: (builds_df, report) where builds_df has the columns of
+               generate_builds() and the same index (the position of the build
+               in the full grid), sorted by BuildScore, and report is a dict with
+               "best_score", "upper_bound" (no build in the window scores higher),
+               "gap" (upper_bound - best_score), "relative_gap", "exact" (whether
+               builds_df is exactly the top_k, up to ties), "passes", "beam_width" (of the
+               last completed pass) and "seconds".
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget
+    weights = [compute_component_weight(component_type, user_weights, relevance_matrix)
+               for component_type in component_types]
+    numerator = sum(weights)
+    levels = _levels(scored_dfs, user_weights, relevance_matrix, max_price, component_types)
+    total = int(np.prod([len(level["rows"]) for level in levels], dtype=float))
+
+    found = {}
+    upper_bound = np.inf
+    # Without candidates for some type no build with a nonzero score fits the window
+    exact = total == 0
+    passes = 0
+    width = beam_width
+    completed_width = 0
+    while not exact:
+        result = _beam_pass(levels, numerator, width, min_price, max_price, top_k,
+                            deadline if passes else None)
+        if result is None:
+            break
+        rows, scores, prices, pruned = result
+        passes += 1
+        completed_width = width
+        for build, score in zip(map(tuple, rows), scores):
+            found[build] = score
+        best = max(found.values(), default=0.0)
+        upper_bound = min(upper_bound, max(best, pruned))
+        # Nothing that was not looked at can beat the k-th best build found
+        ranked = sorted(found.values(), reverse=True)
+        if pruned == -np.inf or (len(ranked) >= top_k and ranked[top_k - 1] >= pruned):
+            exact = True
+            break
+        if time.perf_counter() >= deadline or width >= total:
+            break
+        width *= 4
+
+    # Best builds over all passes, in the order of the grid on ties
+    candidates = np.array(list(found), dtype=np.int64).reshape(-1, len(levels))
+    positions = [level["rows"][candidates[:, j]] for j, level in enumerate(levels)]
+    sizes = [len(df) for df in scored_dfs]
+    grid_ids = np.ravel_multi_index(positions, sizes) if len(candidates) else np.zeros(0, dtype=np.int64)
+    order = np.lexsort((grid_ids, -np.array(list(found.values()), dtype=float)))[:top_k]
+    builds_df = _builds_frame(scored_dfs, [p[order] for p in positions], grid_ids[order],
+                              weights, numerator, component_types)
+
+    best = float(builds_df["BuildScore"].iloc[0]) if len(builds_df) else 0.0
+    upper_bound = float(max(upper_bound, best)) if np.isfinite(upper_bound) else best
+    report = {
+        "best_score": best,
+        "upper_bound": upper_bound,
+        "gap": upper_bound - best,
+        "relative_gap": (upper_bound - best) / upper_bound if upper_bound else 0.0,
+        "exact": exact,
+        "passes": passes,
+        "beam_width": completed_width,
+        "seconds": time.perf_counter() - start,
+    }
+    return builds_df, report
+
+
+def _builds_frame(scored_dfs, positions, grid_ids, weights, numerator, component_types):
+    # Same operations, in the same order, as generate_builds()
+    scores = [df["Task Score"].to_numpy(dtype=float)[index] for df, index in zip(scored_dfs, positions)]
+    denominator = sum(weight / score for weight, score in zip(weights, scores)) if positions else 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        build_scores = np.where(denominator != 0, numerator / denominator, 0.0)
+    total_price = sum(df["Price"].to_numpy()[index] for df, index in zip(scored_dfs, positions))
+    total_power = sum(df["Power"].to_numpy()[index] for df, index in zip(scored_dfs, positions))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score_to_price = np.where(total_price != 0, build_scores / total_price, 0)
+    return pd.DataFrame({
+        **{
+            component_type: df[component_type].to_numpy()[index]
+            for df, component_type, index in zip(scored_dfs, component_types, positions)
+        },
+        "TotalPrice": total_price,
+        "TotalPower": total_power,
+        "BuildScore": build_scores,
+        "ScoreToPrice": score_to_price,
+    }, index=grid_ids)
+
+
+def run_beam_search(dfs, query, top_k=10, beam_width=BEAM_WIDTH, time_budget=BEAM_TIME_BUDGET):
+    """
+    Filters and scores the components for a query (see normalize_query()) and
+    runs beam_search_builds() over its price window.
+
+    Returns:
+        tuple: (builds_df, report)
+    """
+    query = normalize_query(query)
+    filtered_dfs = apply_all_filters(
+        *dfs,
+        gpu_filters=query["gpu_filters"],
+        cpu_filters=query["cpu_filters"],
+        ram_filters=query["ram_filters"]
+    )
+    scored_dfs = score_all_dfs(filtered_dfs, query["user_weights"])
+    return beam_search_builds(scored_dfs, query["user_weights"], query["relevance_matrix"],
+                              query["min_price"], query["max_price"], top_k,
+                              beam_width, time_budget)
+
+
+def synthetic_catalog(sizes, seed=0, component_types=COMPONENT_TYPES):
+    """
+    Random scored component DataFrames in which price grows with Task Score, with
+    noise, like in real catalogs.
+    """
+    rng = np.random.default_rng(seed)
+    dfs = []
+    for size, component_type, scale in zip(sizes, component_types, (1500, 700, 300)):
+        score = rng.uniform(5, 100, size)
+        price = np.round(scale * (score / 100) ** 2 * rng.lognormal(0, 0.3, size) + 20, 2)
+        dfs.append(pd.DataFrame({
+            component_type: [f"{component_type}_{i}" for i in range(size)],
+            "Task Score": score,
+            "Price": price,
+            "Power": np.round(rng.uniform(5, 300, size)),
+        }))
+    return tuple(dfs)
+
+
+if __name__ == "__main__":
+    from .build_combinations import generate_builds, filter_builds_by_price
+
+    user_weights = {"Gaming": 8, "ML/AI": 5, "HPC": 3, "3D Rendering": 6}
+    top_k = 10
+
+    print("Against generate_builds() on small synthetic catalogs:")
+    for seed in range(5):
+        dfs = synthetic_catalog((40, 40, 25), seed=seed)
+        min_price, max_price = 300 + 100 * seed, 900 + 200 * seed
+        exact = filter_builds_by_price(generate_builds(dfs, user_weights), min_price, max_price).head(top_k)
+        for beam_width in (4, 64):
+            builds, report = beam_search_builds(dfs, user_weights, min_price=min_price, max_price=max_price,
+                                                top_k=top_k, beam_width=beam_width, time_budget=0)
+            optimum = exact["BuildScore"].iloc[0]
+            hits = len(set(builds.index) & set(exact.index))
+            assert report["upper_bound"] >= optimum - 1e-12 and report["best_score"] <= optimum
+            assert not report["exact"] or hits == len(exact)
+            print(f"  seed {seed}, width {beam_width:>3}: best {report['best_score']:.4f} "
+                  f"optimum {optimum:.4f} bound {report['upper_bound']:.4f} "
+                  f"top-{top_k} overlap {hits}/{len(exact)} exact={report['exact']}")
+
+    print("Anytime search on a large synthetic catalog:")
+    dfs = synthetic_catalog((4000, 3000, 2000), seed=42)
+    print(f"  {int(np.prod([len(df) for df in dfs], dtype=float)):.3g} builds")
+    for time_budget in (0, 0.5, 2.0):
+        builds, report = beam_search_builds(dfs, user_weights, min_price=900, max_price=1000,
+                                            top_k=top_k, beam_width=16, time_budget=time_budget)
+        print(f"  budget {time_budget:>3}s: {report['passes']} passes (width {report['beam_width']}) "
+              f"in {report['seconds']:.2f}s, best {report['best_score']:.4f}, "
+              f"gap <= {report['gap']:.4f} ({report['relative_gap']:.2%}), exact={report['exact']}")
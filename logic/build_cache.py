@@ -0,0 +1,202 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .settings import *
+from .filters import apply_component_filters
+
+
+class LRUCache:
+    """
+    A small least-recently-used mapping with a fixed number of entries.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._entries.pop(key, default)
+
+    def clear(self):
+        self._entries.clear()
+
+    def items(self):
+        return list(self._entries.items())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class BuildEntry:
+    """
+    A cached output of generate_builds() together with the query that produced it
+    and, per component type, the row positions of the builds using each component
+    and the price that component contributes to each build. The positions let
+    price updates touch only the affected rows.
+
+    Tables may be read by executor threads at any time, so they are never
+    modified. A price update only records the affected rows, at a cost that
+    depends on those rows alone; the next read of `builds_df` swaps in a table
+    with patched TotalPrice and ScoreToPrice columns (see apply_price_changes()).
+    """
+
+    def __init__(self, query, builds_df, component_prices, component_types=COMPONENT_TYPES):
+        """
+        Args:
+            component_prices (dict): {component_type: {name: price}} of the
+                components the table was generated from.
+        """
+        self.query = query
+        self._builds_df = builds_df
+        self._pending = []
+        self._lock = threading.Lock()
+        self.component_types = [col for col in component_types if col in builds_df.columns]
+        self.positions = {
+            component_type: dict(builds_df.groupby(component_type, sort=False).indices)
+            for component_type in self.component_types
+        }
+        self.build_prices = {
+            component_type: builds_df[component_type].map(component_prices[component_type])
+                                                     .to_numpy(dtype=float, copy=True)
+            for component_type in self.component_types
+        }
+
+    @property
+    def builds_df(self):
+        """
+        The builds table with every price update applied so far. Patching copies
+        the TotalPrice and ScoreToPrice columns once for all updates since the
+        last read, so read it where a full pass over the table is made anyway
+        (e.g. in the executor job that ranks it).
+        """
+        with self._lock:
+            if self._pending:
+                touched = np.zeros(len(self._builds_df), dtype=bool)
+                for rows in self._pending:
+                    touched[rows] = True
+                self._builds_df = self._patched(np.flatnonzero(touched))
+                self._pending = []
+            return self._builds_df
+
+    def _patched(self, rows):
+        df = self._builds_df
+        prices = df["TotalPrice"].to_numpy(dtype=float, copy=True)
+        prices[rows] = sum(self.build_prices[component_type][rows] for component_type in self.component_types)
+        ratio = df["ScoreToPrice"].to_numpy(dtype=float, copy=True)
+        scores = df["BuildScore"].to_numpy()[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio[rows] = np.where(prices[rows] != 0, scores / prices[rows], 0)
+
+        # Readers of the old table are not affected: the other columns are shared
+        patched = df.copy(deep=False)
+        patched["TotalPrice"] = prices
+        patched["ScoreToPrice"] = ratio
+        return patched
+
+    def apply_price_changes(self, changed, removed):
+        """
+        Records new prices for the builds that use a changed component. On the
+        next read of `builds_df` their TotalPrice is recomputed as the sum of the
+        component prices (like generate_builds()), and their ScoreToPrice with
+        it. Builds using a removed component get a NaN price, which drops them
+        from every price window (see filter_builds_by_price).
+
+        Args:
+            changed (dict): {component_type: {name: (old_price, new_price)}}
+            removed (dict): {component_type: [names]}
+
+        Returns:
+            bool: Whether any row of this table was touched.
+        """
+        touched = []
+        with self._lock:
+            for component_type, names in changed.items():
+                positions = self.positions.get(component_type, {})
+                for name, (_old_price, new_price) in names.items():
+                    rows = positions.get(name)
+                    if rows is None:
+                        continue
+                    self.build_prices[component_type][rows] = new_price
+                    touched.append(rows)
+
+            for component_type, names in removed.items():
+                positions = self.positions.get(component_type, {})
+                for name in names:
+                    rows = positions.pop(name, None)
+                    if rows is None:
+                        continue
+                    self.build_prices[component_type][rows] = np.nan
+                    touched.append(rows)
+
+            self._pending.extend(touched)
+        return bool(touched)
+
+
+class BuildCache(LRUCache):
+    """
+    LRU cache of unranked builds tables keyed by the build fields of a query
+    (filters, weights, relevance matrix). Price window, alpha and grouping are
+    applied on top of a cached table, so they do not take part in the key.
+    """
+
+    def put_builds(self, key, query, builds_df, component_prices):
+        entry = BuildEntry(query, builds_df, component_prices)
+        self.put(key, entry)
+        return entry
+
+    def apply_price_changes(self, changed, removed):
+        """
+        Patches every cached table for a catalog price update.
+
+        Returns:
+            set: Keys of the entries that contained an affected component.
+        """
+        return {
+            key for key, entry in self.items()
+            if entry.apply_price_changes(changed, removed)
+        }
+
+    def invalidate_components(self, component_type, names, rows_df=None):
+        """
+        Drops the cached tables that are affected by changed specifications: those
+        that contain one of the given components, and those whose filters would
+        admit one of the new/changed rows.
+
+        Args:
+            component_type (str): "GPU", "CPU" or "RAM".
+            names (iterable): Components whose old version may be in a cached table.
+            rows_df (pd.DataFrame, optional): The new/changed rows (preprocessed).
+
+        Returns:
+            set: Keys of the dropped entries.
+        """
+        names = set(names)
+        filters_field = component_type.lower() + "_filters"
+        dropped = set()
+        for key, entry in self.items():
+            positions = entry.positions.get(component_type, {})
+            hit = any(name in positions for name in names)
+            if not hit and rows_df is not None and not rows_df.empty:
+                admitted = apply_component_filters(component_type, rows_df, entry.query.get(filters_field))
+                hit = not admitted.empty
+            if hit:
+                self.pop(key)
+                dropped.add(key)
+        return dropped
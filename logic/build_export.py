@@ -0,0 +1,311 @@
+# build_export.py
+#
+# Hands ranked builds to other processes on the same host without pickling or
+# CSV: either as an Arrow IPC file/stream (needs pyarrow, which consumers can
+# memory-map) or as a named shared-memory segment (stdlib only) whose columns
+# consumers view as numpy arrays in place.
+#
+# Component names are dictionary-encoded: each component column is stored as
+# int32 codes into a table of the distinct names.
+#
+# Run with:  python -m logic.build_export --shm NAME      (publish the default query)
+#            python -m logic.build_export --arrow PATH
+#            python -m logic.build_export --attach NAME   (read a published segment)
+
+import json
+import struct
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+
+EXPORT_COLUMNS = COMPONENT_TYPES + [
+    "TotalPrice", "TotalPower", "BuildScore", "ScoreToPrice", "RecommendationScore"
+]
+
+SHM_MAGIC = b"PCBUILDS"
+SHM_FORMAT = 1
+SHM_PREAMBLE = struct.Struct("<8sII")  # magic, format, header length
+SHM_ALIGNMENT = 64
+
+# Segments created by this process (attaching to them must leave them tracked)
+_published = set()
+
+
+def _export_frame(ranked_df, columns):
+    missing = [col for col in columns if col not in ranked_df.columns]
+    if missing and ranked_df.empty:
+        # rank_stage() returns an empty price window before it is scored
+        ranked_df = ranked_df.assign(**{
+            col: np.empty(0, dtype=object if col in COMPONENT_TYPES else float) for col in missing
+        })
+    elif missing:
+        raise KeyError(f"Ranked builds are missing columns {missing}")
+    return ranked_df
+
+
+def _encode_names(values):
+    codes, names = pd.factorize(values)
+    return codes.astype(np.int32), [str(name) for name in names]
+
+
+def to_arrow_table(ranked_df, columns=EXPORT_COLUMNS):
+    """
+    Converts ranked builds to a pyarrow Table. Numeric columns are wrapped
+    without copying; component columns become dictionary arrays.
+    """
+    import pyarrow as pa
+
+    ranked_df = _export_frame(ranked_df, columns)
+    arrays = []
+    for col in columns:
+        if col in COMPONENT_TYPES:
+            codes, names = _encode_names(ranked_df[col])
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(names, pa.string())))
+        else:
+            arrays.append(pa.array(ranked_df[col].to_numpy()))
+    return pa.Table.from_arrays(arrays, names=list(columns))
+
+
+def write_arrow(ranked_df, path, stream=False, columns=EXPORT_COLUMNS):
+    """
+    Writes ranked builds as an Arrow IPC file (or stream). Putting the file on a
+    tmpfs such as /dev/shm keeps it off the disk.
+
+    Returns:
+        int: Bytes written.
+    """
+    import pyarrow as pa
+
+    table = to_arrow_table(ranked_df, columns)
+    with pa.OSFile(path, "wb") as sink:
+        new_writer = pa.ipc.new_stream if stream else pa.ipc.new_file
+        with new_writer(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.tell()
+
+
+def read_arrow(path):
+    """
+    Memory-maps an Arrow IPC file or stream written by write_arrow(). The
+    returned Table references the mapped pages; nothing is copied.
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(path, "r")
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+def _aligned(offset):
+    return -(-offset // SHM_ALIGNMENT) * SHM_ALIGNMENT
+
+
+def publish_builds(ranked_df, name=None, columns=EXPORT_COLUMNS):
+    """
+    Copies ranked builds into a new named shared-memory segment (one copy, no
+    serialization). The segment lives until the publisher unlinks it (or exits):
+    keep the returned object and call close() and unlink() when it is replaced.
+
+    Layout: a preamble (magic, format, header length), a JSON header with the
+    row count and the dtype and offset of every column, then the column buffers,
+    each aligned to 64 bytes. A component column is stored as int32 codes plus
+    its names as UTF-8 data with int64 end offsets.
+
+    Args:
+        name (str, optional): Segment name; a random one is chosen if omitted.
+
+    Returns:
+        SharedMemory: The segment; its name is what consumers attach to.
+    """
+    ranked_df = _export_frame(ranked_df, columns)
+    buffers = []
+    header = {"rows": len(ranked_df), "columns": []}
+    for col in columns:
+        if col in COMPONENT_TYPES:
+            codes, names = _encode_names(ranked_df[col])
+            encoded = [name.encode("utf-8") for name in names]
+            ends = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+            parts = {"codes": codes, "ends": ends,
+                     "data": np.frombuffer(b"".join(encoded), dtype=np.uint8)}
+        else:
+            values = ranked_df[col].to_numpy()
+            if values.dtype.kind not in "iuf":
+                values = values.astype(float)
+            parts = {"values": values}
+        entry = {"name": col}
+        for part, array in parts.items():
+            array = np.ascontiguousarray(array)
+            entry[part] = {"dtype": array.dtype.newbyteorder("=").str, "length": len(array)}
+            buffers.append((entry[part], array))
+        header["columns"].append(entry)
+
+    # Offsets depend on the header size and vice versa: reserve room for them first
+    for spec, _array in buffers:
+        spec["offset"] = 0
+    offset = _aligned(SHM_PREAMBLE.size + len(json.dumps(header)) + 16 * len(buffers))
+    for spec, array in buffers:
+        spec["offset"] = offset
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+    try:
+        SHM_PREAMBLE.pack_into(shm.buf, 0, SHM_MAGIC, SHM_FORMAT, len(header_bytes))
+        shm.buf[SHM_PREAMBLE.size:SHM_PREAMBLE.size + len(header_bytes)] = header_bytes
+        for spec, array in buffers:
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=spec["offset"])
+            target[:] = array
+            del target
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    _published.add(shm._name)
+    return shm
+
+
+def republish_builds(shm, name):
+    """
+    Copies a segment returned by publish_builds() into a new segment named
+    `name`, e.g. to restore one whose name was unlinked while it is still
+    mapped. The original is left open.
+
+    Returns:
+        SharedMemory: The new segment.
+    """
+    copy = shared_memory.SharedMemory(name=name, create=True, size=shm.size)
+    copy.buf[:shm.size] = shm.buf[:shm.size]
+    _published.add(copy._name)
+    return copy
+
+
+def _attach(name):
+    # Attaching must not register the segment with this process's resource
+    # tracker, or it would be unlinked when the consumer exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+
+    shm = shared_memory.SharedMemory(name=name)
+    if shm._name not in _published:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedBuilds:
+    """
+    Consumer side of publish_builds(): read-only numpy views of the columns of a
+    shared-memory segment. Release every array taken from it before close().
+
+        with SharedBuilds("pc_builds") as builds:
+            best = builds.column("BuildScore").max()
+    """
+
+    def __init__(self, name):
+        self.shm = _attach(name)
+        try:
+            magic, version, header_length = SHM_PREAMBLE.unpack_from(self.shm.buf, 0)
+            if magic != SHM_MAGIC or version != SHM_FORMAT:
+                raise ValueError(f"Shared memory segment {name} does not hold exported builds")
+            start = SHM_PREAMBLE.size
+            header = json.loads(bytes(self.shm.buf[start:start + header_length]))
+        except Exception:
+            self.shm.close()
+            raise
+        self.rows = header["rows"]
+        self._columns = {entry["name"]: entry for entry in header["columns"]}
+        self._names = {}
+
+    def _view(self, spec):
+        array = np.ndarray((spec["length"],), dtype=np.dtype(spec["dtype"]),
+                           buffer=self.shm.buf, offset=spec["offset"])
+        array.flags.writeable = False
+        return array
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def column(self, col):
+        """
+        Returns the values of a numeric column, or the codes of a component
+        column (see names()), as a view of the segment.
+        """
+        entry = self._columns[col]
+        return self._view(entry["values"] if "values" in entry else entry["codes"])
+
+    def names(self, col):
+        """
+        Returns the distinct names of a component column, indexed by its codes.
+        """
+        if col not in self._names:
+            entry = self._columns[col]
+            ends = self._view(entry["ends"])
+            data = bytes(self._view(entry["data"]))
+            starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+            self._names[col] = np.array(
+                [data[a:b].decode("utf-8") for a, b in zip(starts, ends)], dtype=object
+            )
+        return self._names[col]
+
+    def to_frame(self):
+        """
+        Returns the builds as a DataFrame with categorical component columns
+        (a copy, independent of the segment).
+        """
+        data = {}
+        for col, entry in self._columns.items():
+            if "codes" in entry:
+                data[col] = pd.Categorical.from_codes(self.column(col).copy(), categories=self.names(col))
+            else:
+                data[col] = self.column(col).copy()
+        return pd.DataFrame(data)
+
+    def close(self):
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from .catalog import Catalog
+    from .pipeline import run_recommendation
+
+    parser = argparse.ArgumentParser(description="Export ranked builds for other processes")
+    parser.add_argument("--shm", metavar="NAME", help="Publish into a shared-memory segment and wait")
+    parser.add_argument("--arrow", metavar="PATH", help="Write an Arrow IPC file (needs pyarrow)")
+    parser.add_argument("--stream", action="store_true", help="Write an Arrow IPC stream instead of a file")
+    parser.add_argument("--attach", metavar="NAME", help="Print the head of a published segment")
+    args = parser.parse_args()
+
+    if args.attach:
+        with SharedBuilds(args.attach) as builds:
+            print(f"{builds.rows} builds")
+            print(builds.to_frame().head(10))
+    else:
+        query = {"user_weights": {task: 5 for task in TASKS}}
+        ranked = run_recommendation(Catalog.from_excel().dfs, query)
+        if args.arrow:
+            size = write_arrow(ranked, args.arrow, stream=args.stream)
+            print(f"Wrote {len(ranked)} builds to {args.arrow} ({size / 1024:.0f} KiB)")
+        if args.shm:
+            shm = publish_builds(ranked, args.shm)
+            print(f"Published {len(ranked)} builds in shared memory segment {shm.name} "
+                  f"({shm.size / 1024:.0f} KiB); press Enter to remove it")
+            try:
+                input()
+            finally:
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,331 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+from .data_loader import load_specifications
+from .data_preprocessor import preprocess_data, score_column_maxima
+from .spec_scoring import compute_spec_scores, rescore_specifications
+
+
+class Catalog:
+    """
+    Preprocessed component DataFrames kept in memory by long-running consumers
+    (the recommendation service, the GUI), together with a name -> row label index
+    for each component type.
+
+    `version` is increased whenever the contents change in a way that invalidates
+    everything derived from the catalog (e.g. a score renormalization), while
+    `revision` is increased on every change, including price updates that derived
+    data can be patched for.
+
+    When the raw (not yet preprocessed) DataFrames are given, the catalog can also
+    be updated from a re-read sheet with apply_raw_update().
+    """
+
+    def __init__(self, dfs, component_types=COMPONENT_TYPES, raw_dfs=None, scoring=None):
+        self.component_types = list(component_types)
+        self.scoring = scoring
+        self.dfs = tuple(self._with_float_prices(df) for df in dfs)
+        self.raw_dfs = None
+        self.col_maxima = None
+        if raw_dfs is not None:
+            self.raw_dfs = [self._with_float_prices(df) for df in raw_dfs]
+            self.col_maxima = [score_column_maxima(df) for df in self.raw_dfs]
+        self.version = 0
+        self.revision = 0
+        self.index = self._build_index()
+        self._fingerprint = None
+
+    @staticmethod
+    def _with_float_prices(df):
+        # Price updates swap in a float "Price" column, so it starts out as floats
+        df = df.copy()
+        df["Price"] = df["Price"].astype(float)
+        return df
+
+    @classmethod
+    def from_excel(cls, excel_path=EXCEL_PATH, scoring=None):
+        """
+        Loads and preprocesses the workbook into a new catalog.
+
+        Args:
+            excel_path (str): Workbook, or directory of per-type files.
+            scoring (dict, optional): A SPEC_SCORING-like config. If given, the score
+                columns are recomputed from the raw specs instead of read from the sheets.
+        """
+        raw_dfs = list(load_specifications(excel_path))
+        if scoring is not None:
+            raw_dfs = rescore_specifications(raw_dfs, scoring)
+        return cls(preprocess_data(raw_dfs), raw_dfs=raw_dfs, scoring=scoring)
+
+    @classmethod
+    def from_sources(cls, paths, scoring=None, executor="thread"):
+        """
+        Loads and preprocesses vendor exports (see ingestion.ingest_sources()) into a
+        new catalog.
+
+        Returns:
+            tuple: (catalog, ingestion report)
+        """
+        from .ingestion import ingest_sources
+
+        raw_dfs, report = ingest_sources(paths, executor=executor)
+        if scoring is not None:
+            raw_dfs = rescore_specifications(raw_dfs, scoring)
+        return cls(preprocess_data(raw_dfs), raw_dfs=raw_dfs, scoring=scoring), report
+
+    def _build_index(self):
+        return {
+            component_type: self._index_for(component_type, df)
+            for component_type, df in zip(self.component_types, self.dfs)
+        }
+
+    @staticmethod
+    def _index_for(component_type, df):
+        return pd.Series(df.index, index=df[component_type])
+
+    def _replace(self, position, df):
+        self.dfs = self.dfs[:position] + (df,) + self.dfs[position + 1:]
+
+    def get(self, component_type):
+        """
+        Returns the DataFrame for the given component type (e.g. "GPU").
+        """
+        return self.dfs[self.component_types.index(component_type)]
+
+    def apply_price_updates(self, updates):
+        """
+        Applies a batch of price changes and removals. Only the "Price" column of
+        the affected rows changes; removed components are dropped from their
+        DataFrame. Affected DataFrames are replaced by shallow copies with a new
+        "Price" column, never modified in place. If a removal takes away the
+        maximum of a score column, that column is renormalized to 0-100 as in
+        preprocess_data() and `version` is increased.
+
+        Args:
+            updates (iterable): (component_type, name, new_price) tuples, where
+                                new_price=None removes the component.
+
+        Raises:
+            KeyError: For an unknown component type or name.
+            ValueError: For a price that is not a finite positive number.
+
+        Returns:
+            dict: {"changed": {type: {name: (old_price, new_price)}},
+                   "removed": {type: [names]},
+                   "renormalized": bool}
+        """
+        # Later updates of the same component win; validate everything before writing
+        final = {}
+        for component_type, name, price in updates:
+            if component_type not in self.index:
+                raise KeyError(f"Unknown component type: {component_type}")
+            if name not in self.index[component_type].index:
+                raise KeyError(f"Unknown {component_type}: {name}")
+            if price is not None:
+                price = float(price)
+                if not np.isfinite(price) or price <= 0:
+                    raise ValueError(f"Invalid price for {component_type} {name}: {price}")
+            final[(component_type, name)] = price
+
+        # The DataFrames may be in use by other threads (e.g. build_stage() in the
+        # service's executor): prices are written to a new "Price" column that is
+        # swapped in, and the other columns are shared
+        changed = {component_type: {} for component_type in self.component_types}
+        removed = {component_type: [] for component_type in self.component_types}
+        new_prices = {}
+        for (component_type, name), price in final.items():
+            if price is None:
+                removed[component_type].append(name)
+                continue
+            position = self.component_types.index(component_type)
+            label = self.index[component_type][name]
+            old_price = self.dfs[position].at[label, "Price"]
+            if old_price != price:
+                new_prices.setdefault(position, {})[label] = price
+                changed[component_type][name] = (old_price, price)
+                self._set_raw_price(component_type, label, price)
+        for position, prices in new_prices.items():
+            df = self.dfs[position].copy(deep=False)
+            price_column = df["Price"].copy()
+            price_column.loc[list(prices)] = list(prices.values())
+            df["Price"] = price_column
+            self._replace(position, df)
+
+        renormalized = False
+        for position, component_type in enumerate(self.component_types):
+            names = removed[component_type]
+            if not names:
+                continue
+            labels = self.index[component_type][names].to_numpy()
+            df = self.dfs[position].drop(labels)
+            renormalized |= self._renormalize_if_needed(self.dfs[position], df)
+            self._replace(position, df)
+            self.index[component_type] = self.index[component_type].drop(names)
+            if self.raw_dfs is not None:
+                for label in labels:
+                    self._set_raw_price(component_type, label, np.nan)
+                self.col_maxima[position] = score_column_maxima(self.raw_dfs[position])
+
+        if renormalized:
+            self.version += 1
+        self.revision += 1
+        return {"changed": changed, "removed": removed, "renormalized": renormalized}
+
+    def _set_raw_price(self, component_type, label, price):
+        # Keeps the raw sheet in line with the catalog, so that the next
+        # apply_raw_update() diffs against what is actually served
+        if self.raw_dfs is not None:
+            self.raw_dfs[self.component_types.index(component_type)].at[label, "Price"] = price
+
+    def apply_raw_update(self, component_type, new_raw):
+        """
+        Updates one component type from a freshly read (raw) sheet. The sheet is
+        diffed row by row against the previous one, keyed by component name, and
+        only the added or changed rows are preprocessed, normalized by the current
+        score column maxima. Only if a maximum changed is the whole sheet
+        renormalized (and `version` increased).
+
+        Args:
+            component_type (str): "GPU", "CPU" or "RAM".
+            new_raw (pd.DataFrame): The sheet as returned by load_sheet().
+
+        Returns:
+            dict: {"component_type", "added", "removed", "changed" (names whose
+                   specs or scores changed), "price_changed" ({name: (old, new)}),
+                   "renormalized"}
+        """
+        if self.raw_dfs is None:
+            raise ValueError("This catalog was created without raw specifications")
+        position = self.component_types.index(component_type)
+        key = component_type
+        if self.scoring is not None:
+            new_raw = compute_spec_scores(new_raw, component_type, self.scoring[component_type])
+        new_raw = self._with_float_prices(new_raw.dropna(subset=[key]).drop_duplicates(key, keep="last"))
+        old_raw = self.raw_dfs[position]
+        old_df = self.dfs[position]
+
+        raw_diff = diff_rows(old_raw, new_raw, key)
+        new_priced = new_raw.dropna(subset=["Price"])
+        old_names = set(old_df[key])
+        new_names = set(new_priced[key])
+
+        added = new_names - old_names
+        removed = old_names - new_names
+        changed = (set(raw_diff["changed"]) & old_names & new_names) - set(raw_diff["price_only"])
+        price_changed = {}
+        new_prices = new_priced.set_index(key)["Price"]
+        old_prices = old_df.set_index(key)["Price"]
+        for name in set(raw_diff["price_only"]) & old_names & new_names:
+            price_changed[name] = (old_prices[name], new_prices[name])
+
+        report = {
+            "component_type": component_type,
+            "added": sorted(added),
+            "removed": sorted(removed),
+            "changed": sorted(changed),
+            "price_changed": price_changed,
+            "renormalized": False,
+        }
+        if not (raw_diff["added"] or raw_diff["removed"] or raw_diff["changed"]):
+            return report
+
+        col_maxima = score_column_maxima(new_raw)
+        if col_maxima != self.col_maxima[position]:
+            new_df = preprocess_data([new_raw])[0]
+            report["renormalized"] = True
+        else:
+            fresh = new_priced[new_priced[key].isin(added | changed)]
+            processed = preprocess_data([fresh], col_maxima=[col_maxima])[0]
+            kept = old_df[old_df[key].isin(new_names - added - changed)].copy()
+            labels = pd.Series(new_priced.index, index=new_priced[key])
+            kept.index = labels[kept[key]].to_numpy()
+            kept["Price"] = new_prices[kept[key]].to_numpy()
+            new_df = pd.concat([kept, processed]).loc[new_priced.index]
+
+        self.raw_dfs[position] = new_raw
+        self.col_maxima[position] = col_maxima
+        self._replace(position, new_df)
+        self.index[component_type] = self._index_for(component_type, new_df)
+        if report["renormalized"]:
+            self.version += 1
+        self.revision += 1
+        return report
+
+    @staticmethod
+    def _renormalize_if_needed(old_df, new_df, tasks=TASKS):
+        renormalized = False
+        for task in tasks:
+            col = task + " Score"
+            if col not in new_df.columns:
+                continue
+            old_max = old_df[col].max()
+            new_max = new_df[col].max()
+            if pd.notna(new_max) and new_max != 0 and new_max < old_max:
+                new_df[col] = new_df[col] / new_max * 100
+                renormalized = True
+        return renormalized
+
+    def fingerprint(self):
+        """
+        Content hash of the catalog (see catalog_fingerprint()), cached per revision.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.revision:
+            self._fingerprint = (self.revision, catalog_fingerprint(self.dfs))
+        return self._fingerprint[1]
+
+    def __len__(self):
+        return sum(len(df) for df in self.dfs)
+
+
+def catalog_fingerprint(dfs):
+    """
+    Returns a hash of the contents of the preprocessed DataFrames. Equal catalogs
+    get equal fingerprints in every process, so it can tag data derived from them
+    (precomputed tables, persistent caches).
+    """
+    digest = hashlib.sha1()
+    for df in dfs:
+        digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def diff_rows(old_df, new_df, key):
+    """
+    Compares two versions of a sheet row by row, matching rows on the key column.
+
+    Returns:
+        dict: {"added": [...], "removed": [...], "changed": [...], "price_only": [...]}
+              where "price_only" is the subset of "changed" whose only difference is the price.
+    """
+    old = old_df.set_index(key)
+    new = new_df.set_index(key)
+    common = new.index.intersection(old.index)
+
+    columns = new.columns.union(old.columns)
+    a = old.reindex(index=common, columns=columns)
+    b = new.reindex(index=common, columns=columns)
+    equal = (a == b) | (a.isna() & b.isna())
+    for col in columns:
+        if pd.api.types.is_numeric_dtype(a[col]) and pd.api.types.is_numeric_dtype(b[col]):
+            # Tolerate float round-off from re-exported files
+            equal[col] = np.isclose(a[col].to_numpy(float), b[col].to_numpy(float), rtol=1e-12, atol=0, equal_nan=True)
+    changed_mask = ~equal.all(axis=1)
+    rest = [col for col in columns if col != "Price"]
+    price_only_mask = changed_mask & equal[rest].all(axis=1)
+
+    return {
+        "added": list(new.index.difference(old.index)),
+        "removed": list(old.index.difference(new.index)),
+        "changed": list(common[changed_mask.to_numpy()]),
+        "price_only": list(common[price_only_mask.to_numpy()]),
+    }
+
+
+if __name__ == "__main__":
+    catalog = Catalog.from_excel()
+    for component_type, df in zip(catalog.component_types, catalog.dfs):
+        print(component_type, len(df))
@@ -0,0 +1,144 @@
+import os
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+
+from .settings import *
+from .data_loader import load_sheet
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _workbook_sheet_signatures(excel_path):
+    """
+    Returns {sheet name: (crc, size)} of each worksheet part inside the .xlsx
+    archive, read from the zip directory without decompressing the sheets.
+    """
+    with zipfile.ZipFile(excel_path) as zf:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+
+        # Cells only reference shared strings by index, so a change there may
+        # not show up in the sheet part itself: treat it as a change of every sheet
+        try:
+            strings = zf.getinfo("xl/sharedStrings.xml")
+            shared = (strings.CRC, strings.file_size)
+        except KeyError:
+            shared = None
+
+        signatures = {}
+        for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+            target = targets[sheet.get(f"{{{REL_NS}}}id")]
+            member = target.lstrip("/") if target.startswith("/") else "xl/" + target
+            info = zf.getinfo(member)
+            signatures[sheet.get("name")] = (info.CRC, info.file_size, shared)
+    return signatures
+
+
+def source_signatures(path, component_types=COMPONENT_TYPES):
+    """
+    Returns a signature per component type that changes whenever that type's
+    source changes. `path` is the workbook or a directory of per-type files.
+    """
+    if os.path.isdir(path):
+        signatures = {}
+        for component_type in component_types:
+            sheet_name = SPEC_SHEETS[component_type]["sheet_name"]
+            for extension in (".csv", ".xlsx"):
+                file_path = os.path.join(path, sheet_name + extension)
+                if os.path.exists(file_path):
+                    stat = os.stat(file_path)
+                    signatures[component_type] = (file_path, stat.st_mtime_ns, stat.st_size)
+                    break
+        return signatures
+
+    sheets = _workbook_sheet_signatures(path)
+    return {
+        component_type: sheets.get(SPEC_SHEETS[component_type]["sheet_name"])
+        for component_type in component_types
+    }
+
+
+class CatalogWatcher:
+    """
+    Polls the catalog source (settings.EXCEL_PATH by default, or a directory of
+    per-type files) and re-reads only the sheets whose contents changed.
+
+    Use poll() from an existing loop (e.g. a QTimer), or start() to poll in a
+    background thread that passes {component_type: raw_df} to `on_change`.
+    """
+
+    def __init__(self, path=EXCEL_PATH, on_change=None, interval=CATALOG_WATCH_INTERVAL,
+                 component_types=COMPONENT_TYPES):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.component_types = list(component_types)
+        self._stat = self._stat_key()
+        self.signatures = source_signatures(path, self.component_types)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat_key(self):
+        if os.path.isdir(self.path):
+            entries = sorted(os.scandir(self.path), key=lambda entry: entry.name)
+            return tuple((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size) for entry in entries)
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        """
+        Checks the source once.
+
+        Returns:
+            dict: {component_type: raw_df} for every type whose source changed
+                  (empty if nothing changed or the file is still being written).
+        """
+        try:
+            stat = self._stat_key()
+            if stat == self._stat:
+                return {}
+            signatures = source_signatures(self.path, self.component_types)
+            changed = [
+                component_type for component_type in self.component_types
+                if signatures.get(component_type) != self.signatures.get(component_type)
+            ]
+            raw_dfs = {component_type: load_sheet(self.path, component_type) for component_type in changed}
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            # Most likely a save in progress; try again on the next poll
+            return {}
+        self._stat = stat
+        self.signatures = signatures
+        return raw_dfs
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            changes = self.poll()
+            if changes and self.on_change is not None:
+                self.on_change(changes)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import time
+
+    watcher = CatalogWatcher(on_change=lambda changes: print("Changed:", sorted(changes)))
+    watcher.start()
+    print(f"Watching {watcher.path} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
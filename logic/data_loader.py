@@ -1,7 +1,28 @@
+import os
 import pandas as pd
 
 from .settings import *
 
+def load_sheet(path, component_type):
+    """
+    Loads the specifications of one component type.
+
+    Args:
+        path (str): Either the workbook containing all sheets, or a directory of
+                    per-type files named after the sheet ("GPUs.xlsx" / "GPUs.csv").
+        component_type (str): "GPU", "CPU" or "RAM".
+
+    Returns:
+        pd.DataFrame: The raw specifications of that component type.
+    """
+    sheet = SPEC_SHEETS[component_type]
+    if os.path.isdir(path):
+        csv_path = os.path.join(path, sheet["sheet_name"] + ".csv")
+        if os.path.exists(csv_path):
+            return pd.read_csv(csv_path)
+        path = os.path.join(path, sheet["sheet_name"] + ".xlsx")
+    return pd.read_excel(path, sheet_name=sheet["sheet_name"], skiprows=SPEC_SKIPROWS, usecols=sheet["usecols"])
+
 def load_specifications(excel_path = EXCEL_PATH):
     """
     Loads specifications for GPUs, CPUs, and RAMs from the given Excel file.
@@ -12,9 +33,9 @@ def load_specifications(excel_path = EXCEL_PATH):
     Returns:
         tuple: Three pandas DataFrames for GPUs, CPUs, and RAMs respectively.
     """
-    df_gpus = pd.read_excel(excel_path, sheet_name="GPUs", skiprows=7, usecols="A:S")
-    df_cpus = pd.read_excel(excel_path, sheet_name="CPUs", skiprows=7, usecols="A:Y")
-    df_rams = pd.read_excel(excel_path, sheet_name="RAMs", skiprows=7, usecols="A:L")
+    df_gpus = load_sheet(excel_path, "GPU")
+    df_cpus = load_sheet(excel_path, "CPU")
+    df_rams = load_sheet(excel_path, "RAM")
     return df_gpus, df_cpus, df_rams
 
 if __name__ == "__main__":
@@ -3,7 +3,19 @@ import pandas as pd
 from .settings import *
 from .data_loader import *
 
-def preprocess_data(df_list, tasks=TASKS):
+def score_column_maxima(df, tasks=TASKS):
+    """
+    Returns the maximum of each score column over the rows that have a price,
+    i.e. the values preprocess_data() normalizes by.
+    """
+    df = df.dropna(subset=["Price"])
+    return {
+        task + " Score": df[task + " Score"].max()
+        for task in tasks
+        if task + " Score" in df.columns
+    }
+
+def preprocess_data(df_list, tasks=TASKS, col_maxima=None):
     """
     Preprocesses a list of DataFrames by dropping rows with missing prices
     and normalizing each score column to a 0-100 range.
@@ -11,12 +23,15 @@ def preprocess_data(df_list, tasks=TASKS):
     Args:
         df_list (list): List of pandas DataFrames (e.g., [df_gpus, df_cpus, df_rams]).
         score_columns (list): List of column names containing scores to normalize.
+        col_maxima (list, optional): One {column: max} dict per DataFrame to normalize by,
+            instead of the DataFrame's own maxima. Used to preprocess only a few changed
+            rows of a larger table (see score_column_maxima()).
         
     Returns:
         list: List of processed DataFrames.
     """
     processed_list = []
-    for df in df_list:
+    for i, df in enumerate(df_list):
         # Drop rows where 'Price' is missing
         df = df.dropna(subset=["Price"]).copy()
         
@@ -24,7 +39,7 @@ def preprocess_data(df_list, tasks=TASKS):
         for task in tasks:
             col = task + " Score"
             if col in df.columns:
-                col_max = df[col].max()
+                col_max = col_maxima[i].get(col) if col_maxima else df[col].max()
                 # Avoid division by zero
                 if pd.notna(col_max) and col_max != 0:
                     df[col] = df[col] / col_max * 100
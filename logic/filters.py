@@ -80,6 +80,36 @@ def apply_ram_filters(df, memory_type=None, capacity_min=None):
     return filtered_df
 
 
+def apply_component_filters(component_type, df, filters=None):
+    """
+    Applies the filter dict of one component type (see apply_all_filters()).
+
+    Args:
+        component_type (str): "GPU", "CPU" or "RAM".
+        df (pd.DataFrame): DataFrame of that component type.
+        filters (dict, optional): e.g. {"vram_min": 8, "power_max": 300} for GPUs.
+
+    Returns:
+        pd.DataFrame: Filtered DataFrame.
+    """
+    filters = filters or {}
+
+    if component_type == "GPU":
+        return apply_gpu_filters(df,
+                                 vram_min=filters.get("vram_min"),
+                                 power_max=filters.get("power_max"))
+    if component_type == "CPU":
+        return apply_cpu_filters(df,
+                                 cores_min=filters.get("cores_min"),
+                                 power_max=filters.get("power_max"),
+                                 socket=filters.get("socket"))
+    if component_type == "RAM":
+        return apply_ram_filters(df,
+                                 memory_type=filters.get("memory_type"),
+                                 capacity_min=filters.get("capacity_min"))
+    raise ValueError(f"Unknown component type: {component_type}")
+
+
 def apply_all_filters(df_gpus, df_cpus, df_rams,
                       gpu_filters=None,
                       cpu_filters=None,
@@ -96,22 +126,9 @@ def apply_all_filters(df_gpus, df_cpus, df_rams,
     Returns:
         tuple: (filtered_gpus, filtered_cpus, filtered_rams)
     """
-    gpu_filters = gpu_filters or {}
-    cpu_filters = cpu_filters or {}
-    ram_filters = ram_filters or {}
-
-    filtered_gpus = apply_gpu_filters(df_gpus,
-                                      vram_min=gpu_filters.get("vram_min"),
-                                      power_max=gpu_filters.get("power_max"))
-
-    filtered_cpus = apply_cpu_filters(df_cpus,
-                                      cores_min=cpu_filters.get("cores_min"),
-                                      power_max=cpu_filters.get("power_max"),
-                                      socket=cpu_filters.get("socket"))
-
-    filtered_rams = apply_ram_filters(df_rams,
-                                      memory_type=ram_filters.get("memory_type"),
-                                      capacity_min=ram_filters.get("capacity_min"))
+    filtered_gpus = apply_component_filters("GPU", df_gpus, gpu_filters)
+    filtered_cpus = apply_component_filters("CPU", df_cpus, cpu_filters)
+    filtered_rams = apply_component_filters("RAM", df_rams, ram_filters)
 
     return filtered_gpus, filtered_cpus, filtered_rams
 
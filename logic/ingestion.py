@@ -0,0 +1,268 @@
+# ingestion.py
+#
+# Builds the raw catalog from any number of vendor exports instead of the single
+# workbook: the files of each component type are discovered by name, parsed
+# concurrently (CSV, JSON and xlsx), mapped onto the columns preprocess_data()
+# expects and merged into one DataFrame per component type.
+#
+# Run with:  python -m logic.ingestion <files or directories> [--processes]
+
+import fnmatch
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+from .data_loader import load_sheet
+
+# One file (or one sheet of a workbook) holding components of a single type.
+# `sheet` is set for sheets of a multi-type workbook laid out like EXCEL_PATH.
+Source = namedtuple("Source", ["path", "component_type", "format", "sheet"])
+
+SCORE_COLUMNS = [task + " Score" for task in TASKS]
+
+
+def _component_type_of(file_name, component_types):
+    name = file_name.lower()
+    for component_type in component_types:
+        if any(fnmatch.fnmatch(name, pattern) for pattern in INGEST_FILE_PATTERNS[component_type]):
+            return component_type
+    return None
+
+
+def _workbook_sheets(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def discover_sources(paths, component_types=COMPONENT_TYPES, report=None):
+    """
+    Finds the sources of every component type.
+
+    Args:
+        paths (list): Files and/or directories (searched recursively). Files are
+            assigned to a component type by INGEST_FILE_PATTERNS; an .xlsx file
+            matching no pattern is read as a workbook with one sheet per type
+            (SPEC_SHEETS), like EXCEL_PATH.
+        report (list, optional): Receives a report dict (see parse_source()) for
+            every such workbook that cannot be opened, which is then skipped.
+            Without it, the error is raised.
+
+    Returns:
+        list: Source tuples, sorted by path.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names)
+        else:
+            files.append(path)
+
+    sources = []
+    for file_path in sorted(files):
+        base, extension = os.path.splitext(os.path.basename(file_path))
+        extension = extension.lower()
+        if extension not in INGEST_EXTENSIONS or base.startswith(("~$", ".")):
+            continue
+        component_type = _component_type_of(base, component_types)
+        if component_type is not None:
+            sources.append(Source(file_path, component_type, extension[1:], None))
+        elif extension == ".xlsx":
+            start = time.perf_counter()
+            try:
+                sheets = _workbook_sheets(file_path)
+            except Exception as e:
+                if report is None:
+                    raise
+                report.append({"source": file_path, "sheet": None, "component_type": None, "format": "xlsx",
+                               "rows": 0, "seconds": time.perf_counter() - start,
+                               "error": f"{type(e).__name__}: {e}"})
+                continue
+            for component_type in component_types:
+                if SPEC_SHEETS[component_type]["sheet_name"] in sheets:
+                    sources.append(Source(file_path, component_type, "xlsx", SPEC_SHEETS[component_type]["sheet_name"]))
+    return sources
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    # Either a list of records or an object wrapping one, e.g. {"products": [...]}
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        if len(lists) != 1:
+            raise ValueError("expected a list of records or an object with one list of records")
+        data = lists[0]
+    df = pd.json_normalize(data)
+    # JSON null -> NaN, as in the other formats
+    return df.fillna(value=np.nan)
+
+
+def read_source(source):
+    """
+    Reads a source into a DataFrame, with the vendor's column names.
+    """
+    if source.sheet is not None:
+        return load_sheet(source.path, source.component_type)
+    if source.format == "csv":
+        return pd.read_csv(source.path)
+    if source.format == "json":
+        return _read_json(source.path)
+    return pd.read_excel(source.path)
+
+
+def map_columns(df, component_type):
+    """
+    Renames vendor columns onto the catalog schema (the component type's name
+    column, "Price", "Power", the task score columns and the columns the filters
+    read), matching
+    INGEST_NAME_ALIASES / INGEST_COLUMN_ALIASES case-insensitively. Columns that
+    already have a schema name, and all other spec columns, are kept as they are.
+
+    Returns:
+        pd.DataFrame
+    """
+    aliases = {alias: column for column, names in INGEST_COLUMN_ALIASES.items() for alias in names}
+    aliases.update({alias: component_type for alias in INGEST_NAME_ALIASES + [component_type.lower()]})
+    for column in INGEST_COLUMN_ALIASES:
+        aliases[column.lower()] = column
+
+    renames = {}
+    for column in df.columns:
+        target = aliases.get(str(column).strip().lower())
+        if target is not None and target not in df.columns and target not in renames.values():
+            renames[column] = target
+    return df.rename(columns=renames)
+
+
+def _to_number(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    # Vendors write units and prefixes next to the value, e.g. "8 GB" or "DDR5"
+    number = series.astype(str).str.extract(r"(\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(number, errors="coerce")
+
+
+def _typed(df, component_type):
+    filter_columns = INGEST_FILTER_COLUMNS.get(component_type, [])
+    required = [component_type, "Price", "Power"] + SCORE_COLUMNS + filter_columns
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    df = df.dropna(subset=[component_type]).copy()
+    df[component_type] = df[component_type].astype(str).str.strip()
+    for col in ["Price", "Power"] + SCORE_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in filter_columns:
+        if col in INGEST_TEXT_COLUMNS:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip())
+        else:
+            df[col] = _to_number(df[col])
+    return df
+
+
+def parse_source(source):
+    """
+    Reads, maps and types one source. Runs in a worker thread or process.
+
+    Returns:
+        tuple: (DataFrame or None, report dict with the parse time, row count
+               and, if the source could not be used, the error).
+    """
+    start = time.perf_counter()
+    report = {"source": source.path, "sheet": source.sheet, "component_type": source.component_type,
+              "format": source.format, "rows": 0, "seconds": 0.0, "error": None}
+    try:
+        df = _typed(map_columns(read_source(source), source.component_type), source.component_type)
+        report["rows"] = len(df)
+    except Exception as e:
+        df = None
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["seconds"] = time.perf_counter() - start
+    return df, report
+
+
+def ingest_sources(paths, component_types=COMPONENT_TYPES, executor="thread", max_workers=INGEST_WORKERS):
+    """
+    Discovers, parses (concurrently) and merges the sources of every component type.
+    Rows of later sources (in path order) replace rows with the same name.
+
+    Args:
+        paths (list): Files and/or directories, see discover_sources().
+        executor (str): "thread" or "process".
+        max_workers (int): Size of the pool.
+
+    Returns:
+        tuple: (raw_dfs, report) where raw_dfs is a list of DataFrames in the order
+               of component_types, ready for preprocess_data(), and report a list
+               with one dict per source plus one "merged" dict per component type.
+
+    Raises:
+        ValueError: If no usable source was found for a component type.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    report = []
+    sources = discover_sources(paths, component_types, report)
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=max_workers) as pool:
+        results = list(pool.map(parse_source, sources))
+
+    raw_dfs = []
+    report += [source_report for _df, source_report in results]
+    for component_type in component_types:
+        frames = [df for (df, _r), source in zip(results, sources)
+                  if source.component_type == component_type and df is not None]
+        if not frames:
+            raise ValueError(f"No usable {component_type} source in {paths}")
+        merged = pd.concat(frames, ignore_index=True)
+        rows = len(merged)
+        merged = merged.drop_duplicates(subset=[component_type], keep="last").reset_index(drop=True)
+        report.append({"source": "merged", "sheet": None, "component_type": component_type, "format": None,
+                       "rows": len(merged), "seconds": 0.0, "error": None, "duplicates": rows - len(merged)})
+        raw_dfs.append(merged)
+    return raw_dfs, report
+
+
+def format_report(report):
+    """
+    Renders the report of ingest_sources() as a text table.
+    """
+    lines = [f"{'source':<50} {'type':<4} {'format':<6} {'rows':>6} {'seconds':>8}"]
+    for entry in report:
+        source = entry["source"] if entry["sheet"] is None else f"{entry['source']} [{entry['sheet']}]"
+        line = (f"{source[-50:]:<50} {entry['component_type'] or '':<4} {entry['format'] or '':<6} "
+                f"{entry['rows']:>6} {entry['seconds']:>8.3f}")
+        if entry.get("duplicates"):
+            line += f"  ({entry['duplicates']} duplicates replaced)"
+        if entry["error"]:
+            line += f"  skipped: {entry['error']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest vendor exports into the catalog")
+    parser.add_argument("paths", nargs="*", default=[EXCEL_PATH])
+    parser.add_argument("--processes", action="store_true", help="Parse in a process pool instead of threads")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    raw_dfs, report = ingest_sources(args.paths, executor="process" if args.processes else "thread",
+                                     max_workers=args.workers)
+    print(format_report(report))
+    print(f"Total: {time.perf_counter() - start:.3f}s")
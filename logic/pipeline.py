@@ -0,0 +1,131 @@
+import json
+import hashlib
+
+from .settings import *
+from .filters import apply_all_filters
+from .component_scoring import score_all_dfs
+from .build_combinations import generate_builds, filter_builds_by_price
+from .recommendation import compute_composite_recommendation_score, filter_top_in_group
+
+QUERY_FIELDS = [
+    "user_weights", "gpu_filters", "cpu_filters", "ram_filters", "relevance_matrix",
+    "min_price", "max_price", "alpha", "group_cols"
+]
+
+# Fields that determine the (expensive) unranked builds table
+BUILD_FIELDS = ["user_weights", "gpu_filters", "cpu_filters", "ram_filters", "relevance_matrix"]
+
+
+def _clean_filters(filters):
+    cleaned = {}
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        cleaned[key] = value
+    return cleaned
+
+
+def normalize_query(params=None):
+    """
+    Turns the parameters used by MainWindow.on_build_clicked into a canonical query dict.
+    Missing fields fall back to the GUI defaults, numbers are converted to floats and
+    filters set to None are dropped, so equal queries compare (and hash) equal.
+
+    Args:
+        params (dict, optional): Any subset of QUERY_FIELDS.
+
+    Returns:
+        dict: The normalized query.
+    """
+    params = dict(params or {})
+    unknown = set(params) - set(QUERY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown query fields: {sorted(unknown)}")
+
+    group_cols = params.get("group_cols", DEFAULT_GROUP_COLS)
+    relevance_matrix = params.get("relevance_matrix") or RELEVANCE_MATRIX
+    return {
+        "user_weights": {task: float(w) for task, w in (params.get("user_weights") or {}).items()},
+        "gpu_filters": _clean_filters(params.get("gpu_filters")),
+        "cpu_filters": _clean_filters(params.get("cpu_filters")),
+        "ram_filters": _clean_filters(params.get("ram_filters")),
+        "relevance_matrix": {
+            component: {task: float(rel) for task, rel in rels.items()}
+            for component, rels in relevance_matrix.items()
+        },
+        "min_price": float(params.get("min_price", DEFAULT_MIN_PRICE)),
+        "max_price": float(params.get("max_price", DEFAULT_MAX_PRICE)),
+        "alpha": float(params.get("alpha", DEFAULT_ALPHA)),
+        "group_cols": list(group_cols) if group_cols else None,
+    }
+
+
+def query_key(query, fields=QUERY_FIELDS):
+    """
+    Returns a stable hash of the given fields of a normalized query.
+    """
+    subset = {field: query[field] for field in fields}
+    payload = json.dumps(subset, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def build_stage(dfs, query):
+    """
+    Filters, scores and combines the components into the unranked builds table.
+
+    Args:
+        dfs (tuple): Preprocessed (gpus, cpus, rams) DataFrames.
+        query (dict): A normalized query.
+
+    Returns:
+        pd.DataFrame: Output of generate_builds().
+    """
+    filtered_dfs = apply_all_filters(
+        *dfs,
+        gpu_filters=query["gpu_filters"],
+        cpu_filters=query["cpu_filters"],
+        ram_filters=query["ram_filters"]
+    )
+    scored_dfs = score_all_dfs(filtered_dfs, query["user_weights"])
+    return generate_builds(scored_dfs, query["user_weights"], query["relevance_matrix"])
+
+
+def rank_stage(builds_df, query):
+    """
+    Applies the price window, the composite recommendation score and the grouping.
+    The input table is not modified.
+    """
+    builds_df = filter_builds_by_price(builds_df, query["min_price"], query["max_price"])
+    if builds_df.empty:
+        return builds_df
+    builds_df = compute_composite_recommendation_score(builds_df, query["alpha"])
+    if query["group_cols"]:
+        builds_df = filter_top_in_group(builds_df, query["group_cols"], score_col="RecommendationScore")
+    return builds_df
+
+
+def run_recommendation(dfs, query):
+    """
+    Runs the full recommendation pipeline for one query.
+
+    Args:
+        dfs (tuple): Preprocessed (gpus, cpus, rams) DataFrames.
+        query (dict): Query parameters, see normalize_query().
+
+    Returns:
+        pd.DataFrame: Ranked builds.
+    """
+    query = normalize_query(query)
+    return rank_stage(build_stage(dfs, query), query)
+
+
+if __name__ == "__main__":
+    from .data_loader import load_specifications
+    from .data_preprocessor import preprocess_data
+
+    dfs = preprocess_data(load_specifications())
+    query = normalize_query({"user_weights": {"Gaming": 8, "ML/AI": 10, "HPC": 3, "3D Rendering": 3}})
+    print(query_key(query))
+    print(run_recommendation(dfs, query)[["GPU", "CPU", "RAM", "TotalPrice", "BuildScore", "RecommendationScore"]][:10])
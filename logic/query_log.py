@@ -0,0 +1,298 @@
+# query_log.py
+#
+# Records the queries users actually send (GUI and service, opt-in) into a
+# compact JSON-lines log, and replays such a log against a catalog and the
+# current code to catch performance and ranking regressions: the replay reports
+# the latency distribution and peak memory (tracemalloc) and flags every query
+# whose top builds differ from the recorded ones.
+#
+# Run with:  python -m logic.query_log LOG [--excel PATH | --sources PATHS...]
+#                                          [--engine pipeline|collapsed] [--limit N]
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from .settings import *
+from .pipeline import normalize_query, run_recommendation
+from .equivalence import run_collapsed_recommendation
+
+LOG_FORMAT = 1
+
+_engine_version = None
+
+
+def engine_version():
+    """
+    Returns a short hash of the source of the logic package: the same code gives
+    the same version, so a replay can tell whether the engine changed since the
+    log was recorded.
+    """
+    global _engine_version
+    if _engine_version is None:
+        digest = hashlib.sha1()
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _engine_version = digest.hexdigest()[:12]
+    return _engine_version
+
+
+def compact_query(query):
+    """
+    Returns the normalized query without its empty filters.
+    """
+    return {field: value for field, value in normalize_query(query).items()
+            if not (field.endswith("_filters") and not value)}
+
+
+def top_builds(ranked_df, top_k=QUERY_LOG_TOP_K, component_types=COMPONENT_TYPES):
+    """
+    Returns the first top_k rows of a ranking as [component names..., score] lists.
+    """
+    top = ranked_df.head(top_k)
+    if top.empty:
+        return []
+    scores = top["RecommendationScore"].to_numpy(dtype=float)
+    names = zip(*(top[component_type].astype(str) for component_type in component_types))
+    return [list(build) + [float(score)] for build, score in zip(names, scores)]
+
+
+class QueryRecorder:
+    """
+    Appends one line per query to a log file. Each line is written with a single
+    append, so several threads and processes can share a log. Recording never
+    fails a query: write errors are only counted.
+    """
+
+    def __init__(self, path=QUERY_LOG_DEFAULT_PATH, top_k=QUERY_LOG_TOP_K):
+        self.path = path
+        self.top_k = top_k
+        self.recorded = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, query, ranked_df, seconds, source, catalog=None, count=None):
+        """
+        Logs a query with its latency and the top builds it returned.
+
+        Args:
+            query (dict): The query parameters (any subset of QUERY_FIELDS).
+            ranked_df (pd.DataFrame): The ranking that was returned (or its head).
+            seconds (float): Time taken to answer.
+            source (str): Where the query came from, e.g. "gui" or "/recommend".
+            catalog (Catalog, optional): Its fingerprint is logged.
+            count (int, optional): Length of the full ranking, if ranked_df is a head.
+        """
+        entry = {
+            "v": LOG_FORMAT,
+            "t": round(time.time(), 3),
+            "src": source,
+            "engine": engine_version(),
+            "catalog": catalog.fingerprint()[:16] if catalog is not None else None,
+            "ms": round(seconds * 1000, 3),
+            "n": len(ranked_df) if count is None else count,
+            "q": compact_query(query),
+            "top": top_builds(ranked_df, self.top_k),
+        }
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            self.recorded += 1
+        except OSError:
+            self.errors += 1
+
+
+def read_log(path):
+    """
+    Returns the entries of a query log, skipping lines that cannot be parsed
+    (e.g. one cut short by a crash).
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get("v") == LOG_FORMAT:
+                entries.append(entry)
+    return entries
+
+
+def first_difference(recorded, replayed, truncated=True, tolerance=1e-9):
+    """
+    Compares two top-builds lists (see top_builds()) up to the order of equally
+    scored builds. If the lists were cut from longer rankings, the builds tied
+    at the end are not compared by name, as other builds with the same score may
+    have been cut off instead.
+
+    Returns:
+        int: The first rank at which they differ, or None.
+    """
+    if len(recorded) != len(replayed):
+        return min(len(recorded), len(replayed))
+    for rank, (a, b) in enumerate(zip(recorded, replayed)):
+        if abs(a[-1] - b[-1]) > tolerance * max(1.0, abs(a[-1])):
+            return rank
+
+    start = 0
+    while start < len(recorded):
+        end = start + 1
+        while end < len(recorded) and abs(recorded[end][-1] - recorded[start][-1]) <= tolerance:
+            end += 1
+        if end == len(recorded) and truncated:
+            break
+        names = [sorted(tuple(build[:-1]) for build in builds[start:end]) for builds in (recorded, replayed)]
+        if names[0] != names[1]:
+            return start
+        start = end
+    return None
+
+
+def _run_collapsed(dfs, query):
+    return run_collapsed_recommendation(dfs, query)[0]
+
+
+# Replayable engines: (dfs, query) -> ranked builds DataFrame
+ENGINES = {
+    "pipeline": run_recommendation,
+    "collapsed": _run_collapsed,
+}
+
+
+def _distribution(values):
+    if not len(values):
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    values = np.asarray(values, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": p50, "p90": p90, "p99": p99, "max": values.max(), "mean": values.mean()}
+
+
+def replay(entries, dfs, engine="pipeline", measure_memory=True, catalog_fingerprint=None):
+    """
+    Reruns logged queries.
+
+    Each query is run once for its latency and, if measure_memory, once more
+    under tracemalloc for its peak memory (tracing slows allocation down, so the
+    two are not measured together).
+
+    Args:
+        entries (list): Log entries, see read_log().
+        dfs (tuple): Preprocessed (gpus, cpus, rams) DataFrames to run against.
+        engine (str): A key of ENGINES.
+        catalog_fingerprint (str, optional): Fingerprint of the catalog of dfs;
+            entries recorded on another catalog are counted in the report.
+
+    Returns:
+        dict: {"queries", "engine", "engine_version", "recorded_engine_versions",
+               "other_catalog", "latency_ms" and "recorded_latency_ms"
+               (distributions), "peak_memory_mib" (distribution or None),
+               "mismatches" (list of {"index", "source", "rank", "query",
+               "recorded", "replayed"})}
+    """
+    run = ENGINES[engine]
+    latencies = []
+    peaks = []
+    mismatches = []
+    for index, entry in enumerate(entries):
+        query = entry["q"]
+        top_k = len(entry["top"]) or QUERY_LOG_TOP_K
+        start = time.perf_counter()
+        ranked = run(dfs, query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                run(dfs, query)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+            finally:
+                tracemalloc.stop()
+
+        replayed = top_builds(ranked, top_k)
+        rank = first_difference(entry["top"], replayed, truncated=entry["n"] > len(entry["top"]))
+        if rank is not None:
+            mismatches.append({"index": index, "source": entry["src"], "rank": rank, "query": query,
+                               "recorded": entry["top"], "replayed": replayed})
+
+    other_catalog = 0
+    if catalog_fingerprint is not None:
+        other_catalog = sum(1 for entry in entries
+                            if entry["catalog"] and entry["catalog"] != catalog_fingerprint[:16])
+    return {
+        "queries": len(entries),
+        "engine": engine,
+        "engine_version": engine_version(),
+        "recorded_engine_versions": sorted({entry["engine"] for entry in entries}),
+        "other_catalog": other_catalog,
+        "latency_ms": _distribution(latencies),
+        "recorded_latency_ms": _distribution([entry["ms"] for entry in entries]),
+        "peak_memory_mib": _distribution(peaks) if measure_memory else None,
+        "mismatches": mismatches,
+    }
+
+
+def format_replay_report(report):
+    """
+    Renders the report of replay() as text.
+    """
+    def row(label, distribution, unit):
+        return (f"{label:<18}" + "".join(f"{name} {distribution[name]:>9.1f}{unit}  "
+                                         for name in ["p50", "p90", "p99", "max", "mean"]))
+
+    lines = [
+        f"{report['queries']} queries replayed with the {report['engine']} engine "
+        f"(version {report['engine_version']}, recorded with {', '.join(report['recorded_engine_versions']) or '-'})",
+        row("latency", report["latency_ms"], "ms"),
+        row("recorded latency", report["recorded_latency_ms"], "ms"),
+    ]
+    if report["peak_memory_mib"] is not None:
+        lines.append(row("peak memory", report["peak_memory_mib"], "MiB"))
+    if report["other_catalog"]:
+        lines.append(f"{report['other_catalog']} queries were recorded on another catalog")
+    lines.append(f"{len(report['mismatches'])} queries with a different top-{QUERY_LOG_TOP_K}")
+    for mismatch in report["mismatches"]:
+        recorded = mismatch["recorded"][mismatch["rank"]] if mismatch["rank"] < len(mismatch["recorded"]) else None
+        replayed = mismatch["replayed"][mismatch["rank"]] if mismatch["rank"] < len(mismatch["replayed"]) else None
+        lines.append(f"  #{mismatch['index']} ({mismatch['source']}) rank {mismatch['rank'] + 1}: "
+                     f"recorded {recorded}, now {replayed}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    from .catalog import Catalog
+
+    parser = argparse.ArgumentParser(description="Replay a recorded query log")
+    parser.add_argument("log", nargs="?", default=QUERY_LOG_PATH or QUERY_LOG_DEFAULT_PATH)
+    parser.add_argument("--excel", default=EXCEL_PATH, help="Catalog to replay against")
+    parser.add_argument("--sources", nargs="+", default=None, help="Vendor exports to replay against (see ingestion.py)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="pipeline")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the last N queries")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    if args.sources:
+        catalog, _report = Catalog.from_sources(args.sources)
+    else:
+        catalog = Catalog.from_excel(args.excel)
+    entries = read_log(args.log)
+    if args.limit is not None:
+        entries = entries[-args.limit:]
+    report = replay(entries, catalog.dfs, args.engine, measure_memory=not args.no_memory,
+                    catalog_fingerprint=catalog.fingerprint())
+    print(format_replay_report(report))
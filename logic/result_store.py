@@ -0,0 +1,260 @@
+# result_store.py
+#
+# Disk-backed cache of ranked results, shared by every GUI session and service
+# worker on the machine. Entries are keyed by the catalog fingerprint and the
+# canonical query hash; a result is stored as the positions of its builds in the
+# (filtered) GPU x CPU x RAM grid, so a warm query is answered by recomputing a
+# handful of rows instead of running generate_builds().
+#
+# SQLite in WAL mode provides the locking between processes; the total size of
+# the stored rankings is bounded and the least recently used ones are evicted.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+from .filters import apply_all_filters
+from .component_scoring import score_all_dfs
+from .build_combinations import compute_component_weight
+from .pipeline import normalize_query, query_key
+
+STORE_FORMAT = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    ids BLOB NOT NULL,
+    count INTEGER NOT NULL,
+    p_max REAL NOT NULL,
+    e_max REAL NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def _filtered_dfs(dfs, query):
+    return apply_all_filters(
+        *dfs,
+        gpu_filters=query["gpu_filters"],
+        cpu_filters=query["cpu_filters"],
+        ram_filters=query["ram_filters"]
+    )
+
+
+def encode_ranking(dfs, query, ranked_df, component_types=COMPONENT_TYPES):
+    """
+    Packs a ranked builds DataFrame into (blob, p_max, e_max): the grid positions
+    of its builds as compressed uint32 values, plus the two maxima the
+    recommendation score was normalized with.
+
+    Returns:
+        tuple: Or None if the builds cannot be located in the catalog (e.g. the
+               ranking was computed from an older catalog).
+    """
+    filtered = _filtered_dfs(dfs, query)
+    sizes = [len(df) for df in filtered]
+    if np.prod(sizes, dtype=np.int64) > np.iinfo(np.uint32).max:
+        return None
+    positions = []
+    for df, component_type in zip(filtered, component_types):
+        names = pd.Index(df[component_type])
+        if not names.is_unique:
+            return None
+        index = names.get_indexer(ranked_df[component_type])
+        if (index < 0).any():
+            return None
+        positions.append(index)
+    ids = np.ravel_multi_index(positions, sizes).astype("<u4")
+
+    # The row with the largest normalized value carries the maximum (exactly,
+    # unless grouping dropped the build that had it)
+    maxima = []
+    for value_col, normalized_col in (("BuildScore", "NormalizedPerformance"),
+                                      ("ScoreToPrice", "NormalizedEfficiency")):
+        if ranked_df.empty:
+            maxima.append(0.0)
+            continue
+        normalized = ranked_df[normalized_col].to_numpy(dtype=float)
+        best = normalized.argmax()
+        value = ranked_df[value_col].to_numpy(dtype=float)[best]
+        maxima.append(float(value / normalized[best]) if normalized[best] else 0.0)
+    return zlib.compress(ids.tobytes()), maxima[0], maxima[1]
+
+
+def decode_ranking(dfs, query, blob, p_max, e_max, component_types=COMPONENT_TYPES):
+    """
+    Rebuilds the ranked DataFrame stored by encode_ranking(): the same rows, in
+    the same order and with the same columns as rank_stage() returned.
+    """
+    filtered = _filtered_dfs(dfs, query)
+    scored = score_all_dfs(filtered, query["user_weights"])
+    sizes = [len(df) for df in scored]
+    ids = np.frombuffer(zlib.decompress(blob), dtype="<u4").astype(np.int64)
+    rows = np.unravel_index(ids, sizes)
+
+    # Same operations, in the same order, as generate_builds()
+    scores = [df["Task Score"].to_numpy(dtype=float)[index] for df, index in zip(scored, rows)]
+    weights = [
+        compute_component_weight(component_type, query["user_weights"], query["relevance_matrix"])
+        for component_type in component_types
+    ]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = sum(weight / score for weight, score in zip(weights, scores))
+        build_scores = np.where(
+            np.all([score > 0 for score in scores], axis=0) & (denominator != 0),
+            sum(weights) / denominator, 0
+        )
+    total_price = sum(df["Price"].to_numpy()[index] for df, index in zip(scored, rows))
+    total_power = sum(df["Power"].to_numpy()[index] for df, index in zip(scored, rows))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score_to_price = np.where(total_price != 0, build_scores / total_price, 0)
+
+    ranked_df = pd.DataFrame({
+        **{
+            component_type: df[component_type].array[index]
+            for df, component_type, index in zip(scored, component_types, rows)
+        },
+        "TotalPrice": total_price,
+        "TotalPower": total_power,
+        "BuildScore": build_scores,
+        "ScoreToPrice": score_to_price,
+    }, index=ids)
+    if ranked_df.empty:
+        # Like rank_stage(), which returns an empty window before scoring it
+        return ranked_df
+    ranked_df["NormalizedPerformance"] = build_scores / p_max if p_max else 0
+    ranked_df["NormalizedEfficiency"] = score_to_price / e_max if e_max else 0
+    ranked_df["RecommendationScore"] = (
+        query["alpha"] * ranked_df["NormalizedPerformance"] +
+        (1 - query["alpha"]) * ranked_df["NormalizedEfficiency"]
+    )
+    return ranked_df
+
+
+class ResultStore:
+    """
+    Persistent, size-bounded cache of ranked results in an SQLite database that
+    any number of threads and processes may use at the same time. Storage errors
+    (locked or unwritable database) are treated as cache misses; only opening the
+    store raises (OSError or sqlite3.Error) if the database cannot be created.
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH, max_bytes=RESULT_STORE_MAX_BYTES, timeout=5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; SQLite connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(fingerprint, query):
+        payload = json.dumps([STORE_FORMAT, fingerprint, query_key(query)])
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, catalog, query):
+        """
+        Returns the stored ranking for the query on this catalog, or None.
+        """
+        query = normalize_query(query)
+        key = self.make_key(catalog.fingerprint(), query)
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT ids, p_max, e_max FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decode_ranking(catalog.dfs, query, *row)
+
+    def put(self, catalog, query, ranked_df):
+        """
+        Stores a ranking computed from the catalog's current contents.
+
+        Returns:
+            bool: Whether it was stored.
+        """
+        query = normalize_query(query)
+        fingerprint = catalog.fingerprint()
+        encoded = encode_ranking(catalog.dfs, query, ranked_df)
+        if encoded is None:
+            return False
+        blob, p_max, e_max = encoded
+        key = self.make_key(fingerprint, query)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, ids, count, p_max, e_max, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, blob, len(ranked_df), p_max, e_max, len(blob), time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used"):
+            evicted.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the persistent result cache")
+    parser.add_argument("--path", default=RESULT_STORE_PATH)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    store = ResultStore(args.path)
+    if args.clear:
+        store.clear()
+    stats = store.stats()
+    print(f"{args.path}: {stats['entries']} results, {stats['bytes'] / 1024:.0f} KiB "
+          f"of {stats['max_bytes'] / 1024 / 1024:.0f} MiB")
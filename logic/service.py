@@ -0,0 +1,614 @@
+# service.py
+#
+# Long-running recommendation service. Keeps the preprocessed catalog and the
+# per-query caches in memory and answers JSON requests over HTTP:
+#
+#   POST /recommend   body: the parameters of MainWindow.on_build_clicked, e.g.
+#                     {"user_weights": {"Gaming": 5, ...}, "min_price": 500, "max_price": 2000,
+#                      "gpu_filters": {"vram_min": 8}, "alpha": 0.6, "limit": 20}
+#                     (answered from the slider table, see slider_table.py, or the persistent
+#                      result store, see result_store.py, when they are enabled)
+#   POST /prices      body: {"updates": [{"component": "GPU", "name": "Nvidia RTX 4070", "price": 549},
+#                                  {"component": "RAM", "name": "DDR4-2133-8/1", "price": null}]}
+#                     (price null removes the component)
+#   POST /sensitivity body: a /recommend query plus optional "samples", "spread", "top_k", "seed";
+#                     reports how stable the top builds are under perturbed weights
+#   POST /export      body: a /recommend query plus "shm": segment name (or "arrow": file name
+#                     in --export-dir, needs pyarrow); publishes the ranked builds for processes
+#                     on the same host (see build_export.py). Re-exporting under a name replaces
+#                     the segment; at most SERVICE_MAX_EXPORTS names are kept.
+#   GET  /metrics     Prometheus text format, including latency histograms
+#   GET  /health
+#
+# Queries to /recommend and /export are logged for replay (see query_log.py) with --record.
+#
+# Run with:  python -m logic.service --port 8765 [--watch] [--slider-table] [--result-store] [--record]
+#                                     [--export-dir DIR]
+
+import asyncio
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .settings import *
+from .catalog import Catalog
+from .catalog_watcher import CatalogWatcher
+from .build_cache import LRUCache, BuildCache, BuildEntry
+from .pipeline import normalize_query, query_key, build_stage, rank_stage, BUILD_FIELDS
+from .sensitivity import analyze_weight_sensitivity
+from .slider_table import SliderTable
+from .result_store import ResultStore
+from .build_export import publish_builds, republish_builds, write_arrow
+from .query_log import QueryRecorder
+
+MAX_BODY_SIZE = 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def _check_export_name(name):
+    """
+    Export names come from clients and must not reach outside the export
+    directory (or /dev/shm): only bare file names are accepted.
+    """
+    if (not isinstance(name, str) or not name or ".." in name
+            or "/" in name or "\\" in name or os.path.basename(name) != name):
+        raise ValueError(f"export names must be bare file names, got {name!r}")
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram in the Prometheus format.
+    """
+
+    def __init__(self, buckets=SERVICE_LATENCY_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def render(self, name, labels):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class RecommendationService:
+    """
+    Serves recommendations from a warm, in-memory catalog.
+
+    Two cache levels are kept on the event loop thread: unranked builds tables
+    (keyed by filters/weights/relevance) and final ranked results (keyed by the
+    whole query). Cache misses run in a thread pool so that cached queries are
+    answered while slow ones are being computed, and identical queries that
+    arrive while the first one is still running share its result.
+    """
+
+    def __init__(self, catalog=None, workers=SERVICE_WORKERS,
+                 result_cache_size=SERVICE_RESULT_CACHE_SIZE,
+                 build_cache_size=SERVICE_BUILD_CACHE_SIZE, slider_table=None, result_store=None,
+                 recorder=None, export_dir=EXPORT_DIR, max_exports=SERVICE_MAX_EXPORTS):
+        self.catalog = catalog if catalog is not None else Catalog.from_excel()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.results = LRUCache(result_cache_size)
+        self.builds = BuildCache(build_cache_size)
+        self.slider_table = slider_table
+        self.result_store = result_store
+        self.recorder = recorder
+        self.export_dir = export_dir
+        self.max_exports = max_exports
+        self._inflight = {}
+        self.histograms = {}
+        self.counters = {
+            "requests_total": {},
+            "result_cache_hits_total": 0,
+            "build_cache_hits_total": 0,
+            "coalesced_requests_total": 0,
+            "executor_jobs_total": 0,
+            "price_updates_total": 0,
+            "catalog_reloads_total": 0,
+            "slider_table_hits_total": 0,
+            "result_store_hits_total": 0,
+            "exports_total": 0,
+        }
+        self.exports = {}
+        self.watcher = None
+
+    # ---- Query handling ----
+
+    async def _coalesce(self, key, make_coro):
+        """
+        Runs make_coro() once per key; concurrent callers with the same key await the same task.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced_requests_total"] += 1
+        return await asyncio.shield(task)
+
+    async def _run_in_executor(self, func, *args):
+        self.counters["executor_jobs_total"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _get_builds(self, query):
+        key = (self.catalog.version, query_key(query, BUILD_FIELDS))
+        entry = self.builds.get(key)
+        if entry is not None:
+            self.counters["build_cache_hits_total"] += 1
+            return key, entry
+
+        async def compute():
+            revision = self.catalog.revision
+            entry = await self._run_in_executor(_make_build_entry, self.catalog.dfs, query)
+            if revision == self.catalog.revision:
+                self.builds.put(key, entry)
+            return key, entry
+
+        return await self._coalesce(("builds",) + key, compute)
+
+    async def recommend(self, params):
+        """
+        Returns the ranked builds DataFrame for the given query parameters.
+        """
+        query = normalize_query(params)
+        key = (self.catalog.version, query_key(query))
+        cached = self.results.get(key)
+        if cached is not None:
+            self.counters["result_cache_hits_total"] += 1
+            return cached[1]
+
+        async def compute():
+            revision = self.catalog.revision
+            build_key = (self.catalog.version, query_key(query, BUILD_FIELDS))
+            if self.result_store is not None:
+                ranked = await self._run_in_executor(self.result_store.get, self.catalog, query)
+                if ranked is not None:
+                    self.counters["result_store_hits_total"] += 1
+                    if revision == self.catalog.revision:
+                        self.results.put(key, (build_key, ranked))
+                    return ranked
+
+            build_key, entry = await self._get_builds(query)
+            # Pending price patches are applied here, off the event loop
+            ranked = await self._run_in_executor(lambda: rank_stage(entry.builds_df, query))
+            if revision == self.catalog.revision:
+                self.results.put(key, (build_key, ranked))
+                if self.result_store is not None:
+                    await self._run_in_executor(self.result_store.put, self.catalog, query, ranked)
+            return ranked
+
+        return await self._coalesce(("result",) + key, compute)
+
+    async def recommend_top(self, params, limit):
+        """
+        Returns (top `limit` builds, number of ranked builds, source). Results that
+        are not cached are read from the slider table if it was built from the
+        current catalog and covers the query.
+        """
+        query = normalize_query(params)
+        key = (self.catalog.version, query_key(query))
+        if key not in self.results and self.slider_table is not None \
+                and self.slider_table.matches(self.catalog, query["relevance_matrix"]):
+            ranked = await self._run_in_executor(self.slider_table.lookup, query, limit)
+            if ranked is not None:
+                self.counters["slider_table_hits_total"] += 1
+                return ranked, await self._run_in_executor(self.slider_table.count, query), "slider_table"
+        ranked = await self.recommend(query)
+        return ranked.head(limit), len(ranked), "pipeline"
+
+    async def export(self, params, shm_name=None, arrow_path=None, limit=None):
+        """
+        Publishes the ranked builds for a query into a shared-memory segment and/or
+        an Arrow IPC file in export_dir. Segments stay alive until they are replaced
+        by another export under the same name or the service stops; at most
+        max_exports names are kept. If a re-export fails, the previous segment is
+        kept under its name.
+
+        Raises:
+            ValueError: If a name is not a bare file name, a new segment name is over
+                the limit, or an Arrow file is requested without pyarrow installed.
+
+        Returns:
+            tuple: (full ranked builds DataFrame, report) where report holds the
+                   number of exported rows and the size of each export.
+        """
+        if shm_name is not None:
+            _check_export_name(shm_name)
+            if shm_name not in self.exports and len(self.exports) >= self.max_exports:
+                raise ValueError(f"at most {self.max_exports} shm exports are kept; "
+                                 f"reuse one of {sorted(self.exports)}")
+        if arrow_path is not None:
+            _check_export_name(arrow_path)
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Arrow export needs pyarrow, which is not installed") from None
+            arrow_path = os.path.join(self.export_dir, arrow_path)
+
+        ranked = await self.recommend(params)
+        exported = ranked if limit is None else ranked.head(limit)
+        report = {"rows": len(exported)}
+        if shm_name is not None:
+            shm = await self._publish(exported, shm_name)
+            report["shm"] = {"name": shm_name, "bytes": shm.size}
+        if arrow_path is not None:
+            os.makedirs(self.export_dir, exist_ok=True)
+            size = await self._run_in_executor(write_arrow, exported, arrow_path)
+            report["arrow"] = {"path": arrow_path, "bytes": size}
+        self.counters["exports_total"] += 1
+        return ranked, report
+
+    async def _publish(self, ranked_df, name):
+        # A segment name cannot be swapped atomically: the previous segment is
+        # unlinked but stays mapped (as it does for attached consumers) until the
+        # new one is written, and is published again if that fails
+        previous = self.exports.get(name)
+        if previous is not None:
+            previous.unlink()
+        try:
+            shm = await self._run_in_executor(publish_builds, ranked_df, name)
+        except Exception as e:
+            if previous is not None:
+                del self.exports[name]
+                try:
+                    self.exports[name] = await self._run_in_executor(republish_builds, previous, name)
+                finally:
+                    previous.close()
+            if isinstance(e, FileExistsError):
+                raise ValueError(f"shared memory segment {name!r} belongs to another process") from None
+            raise
+        if previous is not None:
+            previous.close()
+        self.exports[name] = shm
+        return shm
+
+    def _record(self, params, ranked_df, start, source, count=None):
+        if self.recorder is not None:
+            self.recorder.record(params, ranked_df, time.perf_counter() - start, source,
+                                 catalog=self.catalog, count=count)
+
+    def close_exports(self):
+        for shm in self.exports.values():
+            shm.close()
+            shm.unlink()
+        self.exports.clear()
+
+    def apply_price_updates(self, updates):
+        """
+        Applies a batch of price updates/removals to the resident catalog and records
+        them in the cached builds tables, which are patched on their next read (see
+        BuildEntry). Only the rankings computed from a table that contains an updated
+        component are dropped; they are re-ranked from the patched table on the next
+        request.
+
+        Args:
+            updates (iterable): (component_type, name, new_price) tuples, see
+                                Catalog.apply_price_updates().
+
+        Returns:
+            dict: The catalog update report plus the number of touched cache entries.
+        """
+        report = self.catalog.apply_price_updates(updates)
+        if report["renormalized"]:
+            # Scores changed: nothing derived from the old catalog is valid anymore
+            self.builds.clear()
+            self.results.clear()
+            touched = set()
+        else:
+            touched = self.builds.apply_price_changes(report["changed"], report["removed"])
+            self._drop_results(touched)
+        self.counters["price_updates_total"] += 1
+        report["touched_build_tables"] = len(touched)
+        return report
+
+    def reload_components(self, raw_dfs):
+        """
+        Applies re-read sheets ({component_type: raw_df}, see CatalogWatcher) to the
+        resident catalog. Price-only changes and removals are patched into the cached
+        builds tables like apply_price_updates(); tables affected by added or changed
+        components are dropped. Everything is dropped only if a score column had to
+        be renormalized.
+
+        Returns:
+            list: The catalog reports, one per component type.
+        """
+        reports = []
+        for component_type, raw_df in raw_dfs.items():
+            report = self.catalog.apply_raw_update(component_type, raw_df)
+            if report["renormalized"]:
+                self.builds.clear()
+                self.results.clear()
+            else:
+                touched = self.builds.apply_price_changes(
+                    {component_type: report["price_changed"]},
+                    {component_type: report["removed"]}
+                )
+                df = self.catalog.get(component_type)
+                fresh = df[df[component_type].isin(report["added"] + report["changed"])]
+                touched |= self.builds.invalidate_components(component_type, report["changed"], fresh)
+                self._drop_results(touched)
+            self.counters["catalog_reloads_total"] += 1
+            reports.append(report)
+        return reports
+
+    def _drop_results(self, touched_build_keys):
+        for key, (build_key, _ranked) in self.results.items():
+            if build_key in touched_build_keys or build_key not in self.builds:
+                self.results.pop(key)
+
+    def watch(self, path=EXCEL_PATH, interval=CATALOG_WATCH_INTERVAL):
+        """
+        Starts watching the catalog source; changes are applied on the event loop.
+        Must be called from within the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        self.watcher = CatalogWatcher(
+            path,
+            on_change=lambda raw_dfs: loop.call_soon_threadsafe(self._apply_reload, raw_dfs),
+            interval=interval
+        )
+        self.watcher.start()
+        return self.watcher
+
+    def _apply_reload(self, raw_dfs):
+        for report in self.reload_components(raw_dfs):
+            print(f"Reloaded {report['component_type']}s: {len(report['added'])} added, "
+                  f"{len(report['removed'])} removed, {len(report['changed'])} changed, "
+                  f"{len(report['price_changed'])} repriced"
+                  + (" (renormalized)" if report["renormalized"] else ""))
+
+    # ---- Metrics ----
+
+    def _observe(self, endpoint, status, seconds):
+        requests = self.counters["requests_total"]
+        requests[(endpoint, status)] = requests.get((endpoint, status), 0) + 1
+        histogram = self.histograms.setdefault(endpoint, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def render_metrics(self):
+        lines = ["# TYPE recommend_request_latency_seconds histogram"]
+        for endpoint, histogram in sorted(self.histograms.items()):
+            lines.extend(histogram.render("recommend_request_latency_seconds", f'endpoint="{endpoint}"'))
+        lines.append("# TYPE recommend_requests_total counter")
+        for (endpoint, status), count in sorted(self.counters["requests_total"].items()):
+            lines.append(f'recommend_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        for name in ["result_cache_hits_total", "build_cache_hits_total",
+                     "coalesced_requests_total", "executor_jobs_total", "price_updates_total", "catalog_reloads_total",
+                     "slider_table_hits_total", "result_store_hits_total", "exports_total"]:
+            lines.append(f"# TYPE recommend_{name} counter")
+            lines.append(f"recommend_{name} {self.counters[name]}")
+        lines.append("# TYPE recommend_inflight_queries gauge")
+        lines.append(f"recommend_inflight_queries {len(self._inflight)}")
+        lines.append("# TYPE recommend_catalog_version gauge")
+        lines.append(f"recommend_catalog_version {self.catalog.version}")
+        return "\n".join(lines) + "\n"
+
+    # ---- HTTP ----
+
+    async def handle_request(self, method, path, body):
+        """
+        Dispatches one HTTP request. Returns (status, content_type, payload).
+        """
+        if path == "/health":
+            return 200, "application/json", {"status": "ok", "catalog_version": self.catalog.version}
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.render_metrics()
+        if path == "/recommend":
+            if method != "POST":
+                return 405, "application/json", {"error": "use POST"}
+            params = json.loads(body or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("request body must be a JSON object")
+            limit = int(params.pop("limit", SERVICE_RESULT_LIMIT))
+            if limit < 0:
+                raise ValueError('"limit" must not be negative')
+            start = time.perf_counter()
+            builds_df, count, source = await self.recommend_top(params, limit)
+            self._record(params, builds_df, start, path, count)
+            records = builds_df.to_dict("records")
+            return 200, "application/json", {"count": count, "builds": records, "source": source}
+        if path == "/sensitivity":
+            if method != "POST":
+                return 405, "application/json", {"error": "use POST"}
+            params = json.loads(body or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("request body must be a JSON object")
+            options = {
+                "n_samples": int(params.pop("samples", 2000)),
+                "spread": float(params.pop("spread", 1.0)),
+                "top_k": int(params.pop("top_k", 10)),
+                "seed": params.pop("seed", None),
+            }
+            if options["n_samples"] > SERVICE_MAX_SENSITIVITY_SAMPLES:
+                raise ValueError(f'"samples" must be at most {SERVICE_MAX_SENSITIVITY_SAMPLES}')
+            query = normalize_query(params)
+            report = await self._run_in_executor(
+                lambda: analyze_weight_sensitivity(self.catalog.dfs, query, **options)
+            )
+            return 200, "application/json", {
+                "top1_stability": report["top1_stability"],
+                "builds": report["builds"].to_dict("records"),
+                "alternatives": report["alternatives"].head(SERVICE_RESULT_LIMIT).to_dict("records"),
+                "elapsed": report["elapsed"],
+            }
+        if path == "/export":
+            if method != "POST":
+                return 405, "application/json", {"error": "use POST"}
+            params = json.loads(body or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("request body must be a JSON object")
+            shm_name = params.pop("shm", None)
+            arrow_path = params.pop("arrow", None)
+            if shm_name is None and arrow_path is None:
+                raise ValueError('give "shm" (segment name) and/or "arrow" (file name)')
+            limit = params.pop("limit", None)
+            if limit is not None and int(limit) < 0:
+                raise ValueError('"limit" must not be negative')
+            start = time.perf_counter()
+            ranked, report = await self.export(params, shm_name, arrow_path, None if limit is None else int(limit))
+            self._record(params, ranked, start, path)
+            return 200, "application/json", report
+        if path == "/prices":
+            if method != "POST":
+                return 405, "application/json", {"error": "use POST"}
+            params = json.loads(body or b"{}")
+            updates = [
+                (update["component"], update["name"], update.get("price"))
+                for update in params["updates"]
+            ]
+            report = self.apply_price_updates(updates)
+            return 200, "application/json", {
+                "changed": sum(len(names) for names in report["changed"].values()),
+                "removed": sum(len(names) for names in report["removed"].values()),
+                "renormalized": report["renormalized"],
+                "touched_build_tables": report["touched_build_tables"],
+                "catalog_version": self.catalog.version,
+            }
+        return 404, "application/json", {"error": f"unknown path {path}"}
+
+    async def _handle_connection(self, reader, writer):
+        start = time.perf_counter()
+        endpoint = "invalid"
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, target, _version = request_line.split(" ", 2)
+            endpoint = target.split("?", 1)[0]
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_SIZE:
+                status, content_type, payload = 413, "application/json", {"error": "request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, content_type, payload = await self.handle_request(method, endpoint, body)
+                except (ValueError, TypeError, KeyError) as e:
+                    status, content_type, payload = 400, "application/json", {"error": str(e)}
+                except Exception as e:
+                    status, content_type, payload = 500, "application/json", {"error": repr(e)}
+
+            if endpoint not in ("/health", "/metrics", "/recommend", "/prices", "/sensitivity", "/export"):
+                endpoint = "other"
+            if not isinstance(payload, str):
+                payload = json.dumps(payload, default=_json_default)
+            data = payload.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            self._observe(endpoint, status, time.perf_counter() - start)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host=SERVICE_HOST, port=SERVICE_PORT, watch_path=None):
+        if watch_path is not None:
+            self.watch(watch_path)
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"Serving recommendations on http://{host}:{port} ({len(self.catalog)} components)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close_exports()
+
+
+def _make_build_entry(dfs, query, component_types=COMPONENT_TYPES):
+    component_prices = {
+        component_type: dict(zip(df[component_type], df["Price"]))
+        for component_type, df in zip(component_types, dfs)
+    }
+    return BuildEntry(query, build_stage(dfs, query), component_prices)
+
+
+def _json_default(value):
+    # numpy scalars (and anything else exposing .item())
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PC Builder recommendation service")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--excel", default=EXCEL_PATH, help="Path to the specifications workbook or a directory of per-type files")
+    parser.add_argument("--sources", nargs="+", default=None,
+                        help="Vendor export files/directories to ingest instead of --excel (see ingestion.py)")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    parser.add_argument("--watch", action="store_true", help="Reload changed sheets of --excel while running")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Compute the task scores from the raw specs (settings.SPEC_SCORING)")
+    parser.add_argument("--slider-table", nargs="?", const=SLIDER_TABLE_PATH, default=None,
+                        help="Answer plain slider queries from a precomputed table (python -m logic.slider_table)")
+    parser.add_argument("--result-store", nargs="?", const=RESULT_STORE_PATH, default=None,
+                        help="Share ranked results with other processes through an on-disk cache")
+    parser.add_argument("--record", nargs="?", const=QUERY_LOG_PATH or QUERY_LOG_DEFAULT_PATH, default=None,
+                        help="Log every query for replay (python -m logic.query_log), by default to "
+                             "PC_BUILDER_QUERY_LOG or ~/.cache/pc_builder/queries.jsonl")
+    parser.add_argument("--export-dir", default=EXPORT_DIR,
+                        help="Directory POST /export writes Arrow files into")
+    args = parser.parse_args()
+    if args.watch and args.sources:
+        # The watcher reloads sheets of the workbook, which would replace the ingested data
+        parser.error("--watch only works with --excel, not with --sources")
+
+    scoring = SPEC_SCORING if args.rescore else None
+    if args.sources:
+        from .ingestion import format_report
+
+        catalog, report = Catalog.from_sources(args.sources, scoring=scoring)
+        print(format_report(report))
+    else:
+        catalog = Catalog.from_excel(args.excel, scoring=scoring)
+    slider_table = None
+    if args.slider_table:
+        slider_table = SliderTable.load(args.slider_table)
+        if not slider_table.matches(catalog):
+            print(f"{args.slider_table} was built from another catalog; rebuild it with python -m logic.slider_table")
+    result_store = ResultStore(args.result_store) if args.result_store else None
+    recorder = QueryRecorder(args.record) if args.record else None
+    service = RecommendationService(catalog, workers=args.workers, slider_table=slider_table,
+                                    result_store=result_store, recorder=recorder, export_dir=args.export_dir)
+    asyncio.run(service.serve_forever(args.host, args.port, args.excel if args.watch else None))
+
+
+if __name__ == "__main__":
+    main()
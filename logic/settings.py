@@ -12,6 +12,15 @@ def resource_path(relative_path):
 # Usage:
 EXCEL_PATH = resource_path("data/Specifications.xlsx")
 
+# Sheet and column range of each component type in the workbook. A directory of
+# per-type files uses the same names, e.g. "GPUs.xlsx" or "GPUs.csv".
+SPEC_SHEETS = {
+    "GPU": {"sheet_name": "GPUs", "usecols": "A:S"},
+    "CPU": {"sheet_name": "CPUs", "usecols": "A:Y"},
+    "RAM": {"sheet_name": "RAMs", "usecols": "A:L"},
+}
+SPEC_SKIPROWS = 7
+
 
 TASKS = ["Gaming", "ML/AI", "HPC", "3D Rendering"]
 
@@ -34,4 +43,138 @@ RELEVANCE_MATRIX = {
         "HPC": 0.3,
         "3D Rendering": 0.3
     }
-}
\ No newline at end of file
+}
+
+COMPONENT_TYPES = ["GPU", "CPU", "RAM"]
+
+# Defaults used by the GUI when turning its widgets into a query
+DEFAULT_MIN_PRICE = 500
+DEFAULT_MAX_PRICE = 2000
+DEFAULT_ALPHA = 0.6
+DEFAULT_GROUP_COLS = ["GPU", "CPU"]
+
+# Recommendation service (python -m logic.service)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 4
+SERVICE_RESULT_CACHE_SIZE = 256
+SERVICE_BUILD_CACHE_SIZE = 32
+SERVICE_RESULT_LIMIT = 50
+SERVICE_LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SERVICE_MAX_SENSITIVITY_SAMPLES = 20000  # upper limit of "samples" in POST /sensitivity
+SERVICE_MAX_EXPORTS = 8  # named shared-memory segments kept alive by POST /export
+# POST /export only writes Arrow files into this directory, under a bare file name
+EXPORT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pc_builder", "exports")
+
+# Hot reload of the catalog files (seconds between polls)
+CATALOG_WATCH_INTERVAL = 1.0
+
+# Raw-spec scoring (see spec_scoring.py), mirroring the weight tables of the workbook:
+#   Score_task = sum_spec( (x_spec / baseline_spec)^exponent_spec * weight[task][spec] ) * baseline_score
+# For RAM, the "channel_factor" multiplies the terms of its specs by
+#   1 + k * (min(modules, channels) - 1) + j * (modules - min(modules, channels))
+SPEC_SCORING = {
+    "GPU": {
+        "baseline": None,  # name of the baseline component; None = first row of the sheet
+        "baseline_score": 1.0,
+        "specs": ["FP16", "FP32", "FP64", "Core Clock Speed", "Memory Bus Width", "Memory Clock Speed ",
+                  "VRAM Capacity", "Pixel Fill Rate", "Texture Units", "RT Cores", "Power"],
+        "exponents": [0.85, 0.9, 0.7, 0.9, 0.75, 0.8, 0.6, 0.85, 0.75, 0.7, -0.5],
+        "weights": {
+            "Gaming":       [0, 0.05, 0, 0.2, 0.15, 0.15, 0.1, 0.15, 0.15, 0.05, 0],
+            "ML/AI":        [0.3, 0.2, 0.05, 0.05, 0.1, 0.05, 0.2, 0, 0, 0.05, 0],
+            "HPC":          [0, 0.2, 0.4, 0.05, 0.1, 0.05, 0.1, 0, 0, 0, 0.1],
+            "3D Rendering": [0.05, 0.25, 0, 0.15, 0.1, 0.1, 0.15, 0.05, 0.05, 0.1, 0],
+        },
+    },
+    "CPU": {
+        "baseline": None,
+        "baseline_score": 1.0,
+        "specs": ["CPU Cores", "Threads", "Base Clock", "Max. Boost Clock", "L2 Cache", "L3 Cache",
+                  "PCI Express", "Power"],
+        "exponents": [0.8, 0.85, 0.9, 0.9, 0.75, 0.8, 0.7, -0.6],
+        "weights": {
+            "Gaming":       [0.1, 0.1, 0.25, 0.3, 0.05, 0.1, 0.05, 0],
+            "ML/AI":        [0.2, 0.25, 0.1, 0.1, 0.15, 0.1, 0.1, 0.05],
+            "HPC":          [0.3, 0.3, 0.05, 0.05, 0.1, 0.1, 0.1, 0.05],
+            "3D Rendering": [0.25, 0.3, 0.1, 0.1, 0.1, 0.1, 0, 0],
+        },
+    },
+    "RAM": {
+        "baseline": None,
+        "baseline_score": 1.0,
+        "specs": ["Data Rate", "Memory Type (DDR)", "Memory Capacity"],
+        "exponents": [0.9, 1, 0.7],
+        "weights": {
+            "Gaming":       [0.5, 0.1, 0.4],
+            "ML/AI":        [0.35, 0.1, 0.55],
+            "HPC":          [0.35, 0.1, 0.55],
+            "3D Rendering": [0.4, 0.1, 0.5],
+        },
+        "channel_factor": {
+            "specs": ["Data Rate", "Memory Type (DDR)"],
+            "modules": "Modules",
+            "channels": 4,
+            "k": 0.1,
+            "j": 0.03,
+        },
+    },
+}
+
+# Precomputed answers for the integer slider grid (python -m logic.slider_table)
+SLIDER_MAX_WEIGHT = 10
+SLIDER_TABLE_PATH = resource_path("data/slider_table.npz")
+SLIDER_TABLE_BAND_WIDTH = 250  # builds are ranked per total-price band of this width
+SLIDER_TABLE_TOP_K = 16  # (GPU, CPU) pairs kept per weight direction, price band and ranking
+
+# Persistent result cache shared by the GUI and service processes (logic/result_store.py)
+RESULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pc_builder", "results.sqlite3")
+RESULT_STORE_MAX_BYTES = 64 * 1024 * 1024  # least recently used results are evicted beyond this
+
+# Multi-source ingestion (logic/ingestion.py): files are assigned to a component type
+# by name; any other workbook is read like EXCEL_PATH (one sheet per type)
+INGEST_FILE_PATTERNS = {
+    "GPU": ["*gpu*"],
+    "CPU": ["*cpu*"],
+    "RAM": ["*ram*", "*memory*"],
+}
+INGEST_EXTENSIONS = [".csv", ".json", ".xlsx"]
+INGEST_WORKERS = 4
+# Vendor column names (matched case-insensitively) -> the columns preprocess_data() expects
+INGEST_NAME_ALIASES = ["name", "model", "product", "product name"]
+INGEST_COLUMN_ALIASES = {
+    "Price": ["price", "price (usd)", "price_usd", "msrp", "cost"],
+    "Power": ["power", "power (w)", "power_w", "tdp", "tdp (w)", "watts"],
+    "Gaming Score": ["gaming", "gaming_score"],
+    "ML/AI Score": ["ml/ai", "ml_ai_score", "ai score", "ml score"],
+    "HPC Score": ["hpc", "hpc_score"],
+    "3D Rendering Score": ["3d rendering", "rendering score", "3d_rendering_score"],
+    "VRAM Capacity": ["vram", "vram (gb)", "vram_gb", "vram capacity (gb)"],
+    "CPU Cores": ["cores", "core count", "cpu_cores"],
+    "CPU Socket": ["socket", "cpu_socket"],
+    "Memory Type (DDR)": ["memory type", "ddr", "ddr generation", "memory_type"],
+    "Memory Capacity": ["capacity", "capacity (gb)", "memory_capacity"],
+}
+# Columns the component filters (logic/filters.py) read; a source without them is
+# skipped. All but INGEST_TEXT_COLUMNS are numeric ("DDR5" or "8 GB" are read as 5 and 8)
+INGEST_FILTER_COLUMNS = {
+    "GPU": ["VRAM Capacity"],
+    "CPU": ["CPU Cores", "CPU Socket"],
+    "RAM": ["Memory Type (DDR)", "Memory Capacity"],
+}
+INGEST_TEXT_COLUMNS = ["CPU Socket"]
+
+# Components that agree on all of these columns rank identically and are collapsed
+# into one equivalence class before the build stage (logic/equivalence.py)
+EQUIVALENCE_COLUMNS = [task + " Score" for task in TASKS] + ["Price", "Power"]
+
+# Anytime beam search over very large catalogs (logic/beam_search.py)
+BEAM_WIDTH = 256  # width of the first pass; every further pass is 4x wider
+BEAM_TIME_BUDGET = 1.0  # seconds
+
+# Opt-in query recording (logic/query_log.py): set PC_BUILDER_QUERY_LOG to a file path
+# to log every GUI query. The service only records with --record, which logs to this
+# path when it is set and no other path is given
+QUERY_LOG_PATH = os.environ.get("PC_BUILDER_QUERY_LOG")
+QUERY_LOG_DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pc_builder", "queries.jsonl")
+QUERY_LOG_TOP_K = 10  # builds of each result kept in the log, compared on replay
@@ -0,0 +1,364 @@
+# slider_table.py
+#
+# Offline precompute of the answers for every integer slider setting. The build
+# score only depends on the direction of the weight vector (scaling all weights
+# leaves both the component scores and the harmonic mean unchanged), so settings
+# such as (2, 2, 0, 4) and (1, 1, 0, 2) share one entry. For each direction and
+# each total-price band, the (GPU, CPU) pairs with the highest BuildScore and the
+# highest ScoreToPrice are stored; a query is answered by re-ranking the builds
+# of the pairs stored for the bands that overlap its price window. The K-th
+# stored values bound every other build, so the answer is exactly the one of
+# run_recommendation(), or the lookup rescores the whole grid when the bound is
+# not tight enough.
+#
+# Run with:  python -m logic.slider_table [--force]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .settings import *
+from .catalog import Catalog
+from .pipeline import normalize_query, rank_stage
+from .sensitivity import (task_score_matrix, batch_component_scores,
+                          batch_component_weights, grid_build_scores)
+
+SLIDER_TABLE_CHUNK_SIZE = 8
+
+
+def weight_directions(max_weight=SLIDER_MAX_WEIGHT, n_tasks=len(TASKS)):
+    """
+    Enumerates the distinct directions of the integer weight vectors in [0, max_weight]^n_tasks.
+
+    Returns:
+        tuple: (directions, direction_of) where directions is a (D, n_tasks) array of
+               primitive weight vectors and direction_of maps every slider setting
+               (flattened with np.ravel_multi_index) to its row in directions.
+    """
+    settings = np.indices((max_weight + 1,) * n_tasks).reshape(n_tasks, -1).T
+    divisor = np.gcd.reduce(settings, axis=1)
+    divisor[divisor == 0] = 1
+    directions, direction_of = np.unique(settings // divisor[:, None], axis=0, return_inverse=True)
+    return directions, direction_of.reshape(-1).astype(np.int32)
+
+
+class SliderTable:
+    """
+    Ranked top (GPU, CPU) pairs per weight direction and price band, for one
+    catalog (identified by its fingerprint) and relevance matrix.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.component_types = meta["component_types"]
+        self.sizes = [len(arrays[component_type + "_names"]) for component_type in self.component_types]
+        self._grid_prices = None  # TotalPrice of every build, see count()
+
+    def save(self, path=SLIDER_TABLE_PATH):
+        np.savez_compressed(path, meta=np.array(json.dumps(self.meta)), **self.arrays)
+
+    @classmethod
+    def load(cls, path=SLIDER_TABLE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+        return cls(meta, arrays)
+
+    def matches(self, catalog, relevance_matrix=RELEVANCE_MATRIX):
+        """
+        Whether the table was built from this catalog and relevance matrix.
+        """
+        return (self.meta["fingerprint"] == catalog.fingerprint()
+                and self.meta["relevance_matrix"] == normalize_query({"relevance_matrix": relevance_matrix})["relevance_matrix"])
+
+    def lookup(self, query, n=10):
+        """
+        Answers a query from the table. The pairs stored for the price bands that
+        overlap the window are used when they provably contain the answer;
+        otherwise every build is rescored from the stored task scores, which is
+        still far cheaper than generate_builds().
+
+        Returns:
+            pd.DataFrame: The top n rows run_recommendation() would return, or None
+                          if the query is not covered by the table (filters, weights
+                          that are not slider values, grouping by other columns,
+                          another relevance matrix).
+        """
+        query = normalize_query(query)
+        if query["gpu_filters"] or query["cpu_filters"] or query["ram_filters"]:
+            return None
+        if query["relevance_matrix"] != self.meta["relevance_matrix"]:
+            return None
+        if any(col not in self.component_types for col in query["group_cols"] or []):
+            return None
+        tasks = self.meta["tasks"]
+        max_weight = self.meta["max_weight"]
+        weights = np.array([query["user_weights"].get(task, 0) for task in tasks], dtype=float)
+        if np.any(weights != np.round(weights)) or np.any(weights < 0) or np.any(weights > max_weight):
+            return None
+
+        setting = np.ravel_multi_index(weights.astype(int), (max_weight + 1,) * len(tasks))
+        direction = self.arrays["direction_of"][setting]
+        w = weights[None, :]
+        component_scores = [
+            batch_component_scores(self.arrays[component_type + "_scores"], w)[0]
+            for component_type in self.component_types
+        ]
+        component_weights = [
+            batch_component_weights(w, component_type, query["relevance_matrix"], tasks)[0]
+            for component_type in self.component_types
+        ]
+
+        ids = None
+        if query["max_price"] >= query["min_price"]:
+            stored, floors = self._stored_candidates(direction, query)
+            ids = self._select(stored, component_scores, component_weights, query, n, floors)
+        if ids is None:
+            ids = self._select(np.arange(np.prod(self.sizes)), component_scores, component_weights, query, n)
+        return rank_stage(self._builds_frame(ids, component_scores, component_weights), query).head(n)
+
+    def count(self, query):
+        """
+        Returns the number of rows run_recommendation() would rank for a query the
+        table covers (see lookup()): the builds in the price window, or the groups
+        that have one.
+        """
+        query = normalize_query(query)
+        if self._grid_prices is None:
+            self._grid_prices = self._total_prices(np.unravel_index(np.arange(np.prod(self.sizes)), self.sizes))
+        ids = np.flatnonzero((self._grid_prices >= query["min_price"]) & (self._grid_prices <= query["max_price"]))
+        if not query["group_cols"]:
+            return len(ids)
+        rows = np.unravel_index(ids, self.sizes)
+        group_axes = [self.component_types.index(col) for col in query["group_cols"]]
+        keys = np.ravel_multi_index([rows[axis] for axis in group_axes], [self.sizes[axis] for axis in group_axes])
+        return len(np.unique(keys))
+
+    def _stored_candidates(self, direction, query):
+        # Every RAM of the (GPU, CPU) pairs stored for the bands overlapping the window
+        width = self.meta["band_width"]
+        n_bands = self.arrays["pairs"].shape[1]
+        first = int(np.clip(query["min_price"] // width, 0, n_bands - 1))
+        last = int(np.clip(query["max_price"] // width, 0, n_bands - 1))
+        pairs = np.concatenate([
+            self.arrays["pairs"][direction, first:last + 1].reshape(-1),
+            self.arrays["efficient_pairs"][direction, first:last + 1].reshape(-1),
+        ])
+        pairs = np.unique(pairs[pairs != np.iinfo(pairs.dtype).max]).astype(np.int64)
+        ids = (pairs[:, None] * self.sizes[-1] + np.arange(self.sizes[-1])[None, :]).reshape(-1)
+
+        # A build of any other pair has at most the K-th stored BuildScore and the
+        # K-th stored ScoreToPrice of its band (nothing if all pairs are stored)
+        floors = [
+            np.maximum(np.nan_to_num(self.arrays[name][direction, first:last + 1, -1].astype(float), nan=0.0), 0)
+            * (1 + 1e-6)
+            for name in ("scores", "efficiencies")
+        ]
+        return ids, floors
+
+    def _build_scores(self, rows, component_scores, component_weights):
+        # weighted_harmonic_mean() of the given builds
+        scores = [type_scores[index] for type_scores, index in zip(component_scores, rows)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            denominator = sum(weight / score for weight, score in zip(component_weights, scores))
+            valid = np.all([score > 0 for score in scores], axis=0) & (denominator != 0)
+            return np.where(valid, sum(component_weights) / denominator, 0)
+
+    def _total_prices(self, rows):
+        return sum(self.arrays[t + "_prices"][index] for t, index in zip(self.component_types, rows))
+
+    def _select(self, ids, component_scores, component_weights, query, n, floors=None):
+        """
+        Reduces the candidate builds `ids` to the ones rank_stage() needs for the
+        top n: those that can reach it plus the two normalization maxima.
+        With floors (per band bounds of the BuildScore and ScoreToPrice of the
+        builds outside `ids`), returns None unless the candidates provably
+        contain the answer.
+        """
+        rows = np.unravel_index(ids, self.sizes)
+        build_scores = self._build_scores(rows, component_scores, component_weights)
+        total_price = self._total_prices(rows)
+        in_window = (total_price >= query["min_price"]) & (total_price <= query["max_price"])
+        bounded = floors is not None and any(floor.any() for floor in floors)
+        if not in_window.any():
+            return None if bounded else ids[:0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score_to_price = np.where(total_price != 0, build_scores / total_price, 0)
+        p_max = build_scores[in_window].max()
+        e_max = score_to_price[in_window].max()
+        alpha = query["alpha"]
+        recommendation = (alpha * build_scores / p_max if p_max else 0) \
+            + ((1 - alpha) * score_to_price / e_max if e_max else 0)
+        recommendation = np.where(in_window, recommendation, -np.inf)
+
+        # Best recommendation score of every group (of every build without grouping)
+        if query["group_cols"]:
+            group_axes = [self.component_types.index(col) for col in query["group_cols"]]
+            keys = np.ravel_multi_index([rows[axis] for axis in group_axes],
+                                        [self.sizes[axis] for axis in group_axes])
+            keys, inverse = np.unique(keys, return_inverse=True)
+            group_scores = np.full(len(keys), -np.inf)
+            np.maximum.at(group_scores, inverse, recommendation)
+        else:
+            group_scores = recommendation
+        group_scores = group_scores[np.isfinite(group_scores)]
+        k = min(n, len(group_scores))
+        threshold = np.partition(group_scores, len(group_scores) - k)[len(group_scores) - k]
+
+        if bounded:
+            score_floors, efficiency_floors = floors
+            # The maxima must be candidates, and no other build may reach the top n
+            if score_floors.max() > p_max or efficiency_floors.max() > e_max or k < n:
+                return None
+            bound = (alpha * score_floors / p_max if p_max else 0) \
+                + ((1 - alpha) * efficiency_floors / e_max if e_max else 0)
+            if threshold <= np.max(bound):
+                return None
+
+        window = np.flatnonzero(in_window)
+        keep = np.flatnonzero(recommendation >= threshold - 1e-9)
+        extremes = [window[build_scores[window].argmax()], window[score_to_price[window].argmax()]]
+        return ids[np.union1d(keep, extremes)]
+
+    def _builds_frame(self, ids, component_scores, component_weights):
+        # The rows of generate_builds() for the given builds, indexed by their position in it
+        rows = np.unravel_index(ids, self.sizes)
+        build_scores = self._build_scores(rows, component_scores, component_weights)
+        total_price = self._total_prices(rows)
+        builds_df = pd.DataFrame({
+            **{t: self.arrays[t + "_names"][index] for t, index in zip(self.component_types, rows)},
+            "TotalPrice": total_price,
+            "TotalPower": sum(self.arrays[t + "_power"][index] for t, index in zip(self.component_types, rows)),
+            "BuildScore": build_scores,
+        }, index=ids)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            builds_df["ScoreToPrice"] = np.where(total_price != 0, build_scores / total_price, 0)
+        return builds_df.sort_values("BuildScore", ascending=False)
+
+
+def build_slider_table(catalog, relevance_matrix=RELEVANCE_MATRIX, top_k=SLIDER_TABLE_TOP_K,
+                       band_width=SLIDER_TABLE_BAND_WIDTH, max_weight=SLIDER_MAX_WEIGHT, tasks=TASKS):
+    """
+    Precomputes the SliderTable of an (unfiltered) catalog: for every weight
+    direction and total-price band, the top_k (GPU, CPU) pairs ranked by the best
+    BuildScore they reach with a RAM in that band.
+
+    Args:
+        catalog (Catalog): The resident catalog.
+        relevance_matrix (dict): Relevance matrix used for the component weights.
+        top_k (int): Pairs kept per direction and price band.
+        band_width (float): Width of the total-price bands.
+        max_weight (int): Largest slider value.
+
+    Returns:
+        SliderTable
+    """
+    dfs = catalog.dfs
+    component_types = catalog.component_types
+    directions, direction_of = weight_directions(max_weight, len(tasks))
+    sizes = [len(df) for df in dfs]
+    n_pairs = int(np.prod(sizes[:-1]))
+    score_matrices = [task_score_matrix(df, tasks) for df in dfs]
+
+    # Sort the builds by (pair, band) so that the best build of every pair in every
+    # band is one maximum.reduceat() per chunk of directions
+    total_price = 0
+    for axis, df in enumerate(dfs):
+        shape = [1] * len(dfs)
+        shape[axis] = len(df)
+        total_price = total_price + df["Price"].to_numpy(dtype=float).reshape(shape)
+    bands = (np.broadcast_to(total_price, sizes).reshape(-1) // band_width).astype(np.int64)
+    bands = np.maximum(bands, 0)
+    n_bands = int(bands.max()) + 1
+    segment_keys = np.repeat(np.arange(n_pairs), sizes[-1]) * n_bands + bands
+    order = np.argsort(segment_keys, kind="stable")
+    segment_keys, starts = np.unique(segment_keys[order], return_index=True)
+
+    total_price = np.broadcast_to(total_price, sizes).reshape(-1)[order]
+    with np.errstate(divide="ignore"):
+        inverse_price = np.where(total_price != 0, 1 / total_price, 0)
+    # Pair ids are stored in the smallest unsigned type; its maximum marks empty slots
+    pair_dtype = np.uint16 if n_pairs < np.iinfo(np.uint16).max else np.uint32
+    missing = np.iinfo(pair_dtype).max
+    arrays = {
+        name: np.full((len(directions), n_bands, top_k), fill, dtype=dtype)
+        for name, fill, dtype in [("pairs", missing, pair_dtype), ("scores", np.nan, np.float32),
+                                  ("efficient_pairs", missing, pair_dtype), ("efficiencies", np.nan, np.float32)]
+    }
+    k = min(top_k, n_pairs)
+    for lo in range(0, len(directions), SLIDER_TABLE_CHUNK_SIZE):
+        w = directions[lo:lo + SLIDER_TABLE_CHUNK_SIZE].astype(float)
+        component_scores = [batch_component_scores(matrix, w) for matrix in score_matrices]
+        component_weights = [
+            batch_component_weights(w, component_type, relevance_matrix, tasks)
+            for component_type in component_types
+        ]
+        build_scores = grid_build_scores(component_scores, component_weights).reshape(len(w), -1)[:, order]
+        for values, pairs_name, scores_name in [(build_scores, "pairs", "scores"),
+                                                (build_scores * inverse_price, "efficient_pairs", "efficiencies")]:
+            pair_scores = np.full((len(w), n_pairs * n_bands), -np.inf)
+            pair_scores[:, segment_keys] = np.maximum.reduceat(values, starts, axis=1)
+            pair_scores = pair_scores.reshape(len(w), n_pairs, n_bands).transpose(0, 2, 1)
+
+            best = np.argpartition(-pair_scores, k - 1, axis=2)[:, :, :k]
+            best_scores = np.take_along_axis(pair_scores, best, axis=2)
+            ranking = np.argsort(-best_scores, axis=2, kind="stable")
+            best = np.take_along_axis(best, ranking, axis=2)
+            best_scores = np.take_along_axis(best_scores, ranking, axis=2)
+            present = np.isfinite(best_scores)
+            arrays[pairs_name][lo:lo + len(w), :, :k] = np.where(present, best, missing)
+            arrays[scores_name][lo:lo + len(w), :, :k] = np.where(present, best_scores, np.nan)
+
+    meta = {
+        "fingerprint": catalog.fingerprint(),
+        "relevance_matrix": normalize_query({"relevance_matrix": relevance_matrix})["relevance_matrix"],
+        "component_types": component_types,
+        "tasks": list(tasks),
+        "max_weight": max_weight,
+        "band_width": band_width,
+        "top_k": top_k,
+    }
+    arrays["direction_of"] = direction_of
+    for df, component_type, matrix in zip(dfs, component_types, score_matrices):
+        arrays[component_type + "_names"] = df[component_type].to_numpy(dtype=str)
+        arrays[component_type + "_prices"] = df["Price"].to_numpy(dtype=float)
+        arrays[component_type + "_power"] = df["Power"].to_numpy()
+        arrays[component_type + "_scores"] = matrix
+    return SliderTable(meta, arrays)
+
+
+def ensure_slider_table(catalog, path=SLIDER_TABLE_PATH, relevance_matrix=RELEVANCE_MATRIX, force=False):
+    """
+    Loads the table at `path`, rebuilding (and saving) it only if it is missing
+    or was built from a different catalog or relevance matrix.
+    """
+    if not force and os.path.exists(path):
+        table = SliderTable.load(path)
+        if table.matches(catalog, relevance_matrix):
+            return table
+    table = build_slider_table(catalog, relevance_matrix)
+    table.save(path)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the slider answer table")
+    parser.add_argument("--excel", default=EXCEL_PATH, help="Path to the specifications workbook")
+    parser.add_argument("--output", default=SLIDER_TABLE_PATH)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the catalog did not change")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = ensure_slider_table(Catalog.from_excel(args.excel), args.output, force=args.force)
+    directions, bands, top_k = table.arrays["pairs"].shape
+    print(f"{args.output}: {directions} weight directions x {bands} price bands x top {top_k} pairs "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
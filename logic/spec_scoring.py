@@ -0,0 +1,123 @@
+import numpy as np
+
+from .settings import *
+
+
+def _baseline_position(df, component_type, config):
+    baseline = config.get("baseline")
+    if baseline is None:
+        return 0
+    matches = np.flatnonzero((df[component_type] == baseline).to_numpy())
+    if len(matches) == 0:
+        raise KeyError(f"Baseline {component_type} not found: {baseline}")
+    return matches[0]
+
+
+def spec_score_matrix(df, component_type, config=None, weights=None, exponents=None,
+                      channel_k=None, channel_j=None, tasks=TASKS):
+    """
+    Computes the task scores of every component from its raw spec columns:
+
+        Score_task = sum_spec( (x_spec / baseline_spec)^exponent_spec * weight[task][spec] ) * baseline_score
+
+    with the RAM channel factor applied to the channel-dependent terms (see SPEC_SCORING).
+
+    Any of weights / exponents / channel_k / channel_j may carry a leading axis of
+    P parameter sets, in which case all sets are evaluated in one pass.
+
+    Args:
+        df (pd.DataFrame): Raw specifications of one component type.
+        component_type (str): "GPU", "CPU" or "RAM".
+        config (dict, optional): Scoring config, defaults to SPEC_SCORING[component_type].
+        weights (array, optional): Spec weights, shape (T, S) or (P, T, S), T = len(tasks).
+        exponents (array, optional): Nonlinear exponents, shape (S,) or (P, S).
+        channel_k, channel_j (float or array, optional): RAM channel factor
+            coefficients, scalar or shape (P,).
+        tasks (list): Task names, in the order of the score axis.
+
+    Returns:
+        np.ndarray: Scores of shape (n, T), or (P, n, T) when parameter sets are given.
+    """
+    config = config or SPEC_SCORING[component_type]
+    specs = config["specs"]
+    W = np.asarray(weights if weights is not None else [config["weights"][task] for task in tasks], dtype=float)
+    E = np.asarray(exponents if exponents is not None else config["exponents"], dtype=float)
+    batched = W.ndim == 3 or E.ndim == 2 or np.ndim(channel_k) == 1 or np.ndim(channel_j) == 1
+    W = W.reshape(-1, len(tasks), len(specs))
+    E = E.reshape(-1, len(specs))
+
+    X = df[specs].to_numpy(dtype=float)
+    baseline_position = _baseline_position(df, component_type, config)
+    baseline = X[baseline_position]
+
+    # (P, n, S): every spec ratio raised to its exponent, for every parameter set
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = (X / baseline)[None, :, :] ** E[:, None, :]
+    # Specs without weight in any task do not contribute (and may be missing/zero)
+    unused = ~(W != 0).any(axis=(0, 1))
+    terms[:, :, unused] = 0
+
+    channel = config.get("channel_factor")
+    if channel:
+        k = np.asarray(channel["k"] if channel_k is None else channel_k, dtype=float).reshape(-1, 1)
+        j = np.asarray(channel["j"] if channel_j is None else channel_j, dtype=float).reshape(-1, 1)
+        modules = df[channel["modules"]].to_numpy(dtype=float)
+        used_channels = np.minimum(modules, channel["channels"])
+        factor = 1 + k * (used_channels - 1) + j * (modules - used_channels)  # (P, n)
+        channel_specs = np.isin(specs, channel["specs"])
+        terms = np.where(channel_specs, terms * factor[:, :, None], terms)
+
+    baseline_score = config.get("baseline_score", 1.0)
+    scores = np.matmul(terms, W.transpose(0, 2, 1)) * baseline_score
+    # By definition the baseline scores baseline_score in every task, even when a
+    # task's spec weights do not add up to 1
+    scores[:, baseline_position, :] = baseline_score
+    return scores if batched else scores[0]
+
+
+def compute_spec_scores(df, component_type, config=None, tasks=TASKS):
+    """
+    Returns a copy of a raw specifications DataFrame with the "<task> Score"
+    columns computed by spec_score_matrix().
+    """
+    scores = spec_score_matrix(df, component_type, config=config, tasks=tasks)
+    df = df.copy()
+    for i, task in enumerate(tasks):
+        df[task + " Score"] = scores[:, i]
+    return df
+
+
+def rescore_specifications(raw_dfs, config=SPEC_SCORING, component_types=COMPONENT_TYPES):
+    """
+    Recomputes the score columns of all raw specification DataFrames, e.g. the
+    output of load_specifications(), before they are passed to preprocess_data().
+    The baseline component must still be present, so this has to run before
+    rows without a price are dropped.
+
+    Returns:
+        list: Rescored DataFrames in the order of component_types.
+    """
+    return [
+        compute_spec_scores(df, component_type, config=config[component_type])
+        for df, component_type in zip(raw_dfs, component_types)
+    ]
+
+
+if __name__ == "__main__":
+    import time
+    from .data_loader import load_specifications
+
+    raw_dfs = load_specifications()
+    for df, component_type in zip(raw_dfs, COMPONENT_TYPES):
+        workbook = df[[task + " Score" for task in TASKS]].to_numpy()
+        computed = spec_score_matrix(df, component_type)
+        print(f"{component_type}: max deviation from workbook scores {np.nanmax(np.abs(computed - workbook)):.2e}")
+
+    # Tuning: evaluate 10,000 random exponent sets for the GPUs at once
+    gpus = raw_dfs[0]
+    config = SPEC_SCORING["GPU"]
+    rng = np.random.default_rng(0)
+    exponents = np.asarray(config["exponents"]) * rng.uniform(0.8, 1.2, size=(10000, len(config["specs"])))
+    start = time.perf_counter()
+    scores = spec_score_matrix(gpus, "GPU", exponents=exponents)
+    print(f"{scores.shape} scores in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,84 @@
+# test_beam_search.py
+#
+# Checks beam_search_builds() against generate_builds() on small synthetic
+# catalogs, where every build can still be enumerated.
+#
+# Run with:  python -m pytest logic/test_beam_search.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .settings import *
+from .build_combinations import generate_builds, filter_builds_by_price
+from .beam_search import beam_search_builds, synthetic_catalog
+
+USER_WEIGHTS = {"Gaming": 8, "ML/AI": 5, "HPC": 3, "3D Rendering": 6}
+SIZES = (12, 10, 8)
+TOP_K = 10
+
+
+def exact_top(dfs, min_price, max_price, top_k=TOP_K):
+    return filter_builds_by_price(generate_builds(dfs, USER_WEIGHTS), min_price, max_price).head(top_k)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_full_width_is_exact(seed):
+    dfs = synthetic_catalog(SIZES, seed=seed)
+    min_price, max_price = 300 + 50 * seed, 900 + 100 * seed
+    expected = exact_top(dfs, min_price, max_price)
+    builds, report = beam_search_builds(dfs, USER_WEIGHTS, min_price=min_price, max_price=max_price,
+                                        top_k=TOP_K, beam_width=int(np.prod(SIZES)), time_budget=0)
+
+    assert report["exact"]
+    assert report["passes"] == 1
+    assert report["gap"] == pytest.approx(0)
+    assert list(builds.index) == list(expected.index)
+    pd.testing.assert_frame_equal(builds, expected, check_exact=False, check_dtype=False)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("beam_width", [1, 4, 16])
+def test_bound_and_top_k_on_narrow_beams(seed, beam_width):
+    dfs = synthetic_catalog(SIZES, seed=seed)
+    min_price, max_price = 400, 1200
+    expected = exact_top(dfs, min_price, max_price)
+    builds, report = beam_search_builds(dfs, USER_WEIGHTS, min_price=min_price, max_price=max_price,
+                                        top_k=TOP_K, beam_width=beam_width, time_budget=0)
+    optimum = expected["BuildScore"].iloc[0]
+
+    # No build in the window beats the bound, and the builds found are real ones
+    assert report["upper_bound"] >= optimum - 1e-12
+    assert report["best_score"] <= optimum + 1e-12
+    assert report["gap"] == pytest.approx(report["upper_bound"] - report["best_score"])
+    assert report["gap"] >= 0
+    everything = generate_builds(dfs, USER_WEIGHTS)
+    pd.testing.assert_frame_equal(builds, everything.loc[builds.index], check_exact=False, check_dtype=False)
+    assert builds["TotalPrice"].between(min_price, max_price).all()
+    assert builds["BuildScore"].is_monotonic_decreasing
+
+    if report["exact"]:
+        assert list(builds.index) == list(expected.index)
+
+
+def test_growing_beam_converges():
+    dfs = synthetic_catalog(SIZES, seed=7)
+    expected = exact_top(dfs, 400, 1200)
+    builds, report = beam_search_builds(dfs, USER_WEIGHTS, min_price=400, max_price=1200,
+                                        top_k=TOP_K, beam_width=1, time_budget=60)
+
+    # Passes widen the beam until the top-K is proven
+    assert report["exact"]
+    assert report["passes"] > 1
+    assert list(builds.index) == list(expected.index)
+
+
+@pytest.mark.parametrize("min_price, max_price", [(1, 2), (1e6, 2e6)])
+def test_empty_window(min_price, max_price):
+    dfs = synthetic_catalog(SIZES, seed=0)
+    builds, report = beam_search_builds(dfs, USER_WEIGHTS, min_price=min_price, max_price=max_price, top_k=TOP_K)
+
+    assert builds.empty
+    assert report["best_score"] == 0
+    assert report["exact"]
+
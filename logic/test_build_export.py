@@ -0,0 +1,119 @@
+# test_build_export.py
+#
+# Round trips of ranked builds through shared memory and Arrow, and the
+# segment handling of the service's /export.
+#
+# Run with:  python -m pytest logic/test_build_export.py
+
+import asyncio
+import json
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from .settings import *
+from .build_combinations import generate_builds
+from .pipeline import normalize_query, rank_stage
+from .beam_search import synthetic_catalog
+from .build_export import EXPORT_COLUMNS, publish_builds, to_arrow_table, SharedBuilds
+from . import service
+
+USER_WEIGHTS = {"Gaming": 8, "ML/AI": 5, "HPC": 3, "3D Rendering": 6}
+
+
+def ranked_builds(min_price=300, max_price=1500):
+    builds = generate_builds(synthetic_catalog((12, 10, 8), seed=0), USER_WEIGHTS)
+    return rank_stage(builds, normalize_query({"user_weights": USER_WEIGHTS,
+                                               "min_price": min_price, "max_price": max_price}))
+
+
+def segment_name(label):
+    return f"pcb_test_{os.getpid()}_{label}"
+
+
+def test_shm_round_trip():
+    ranked = ranked_builds()
+    shm = publish_builds(ranked, segment_name("round_trip"))
+    try:
+        with SharedBuilds(shm.name) as builds:
+            assert builds.rows == len(ranked)
+            assert builds.columns == EXPORT_COLUMNS
+            frame = builds.to_frame()
+        for col in EXPORT_COLUMNS:
+            if col in COMPONENT_TYPES:
+                assert list(frame[col].astype(str)) == list(ranked[col])
+            else:
+                np.testing.assert_array_equal(frame[col].to_numpy(), ranked[col].to_numpy())
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_empty_ranking_exports_zero_rows():
+    ranked = ranked_builds(min_price=1, max_price=2)
+    assert ranked.empty
+    shm = publish_builds(ranked, segment_name("empty"))
+    try:
+        with SharedBuilds(shm.name) as builds:
+            assert builds.rows == 0
+            assert builds.columns == EXPORT_COLUMNS
+            assert len(builds.to_frame()) == 0
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_empty_ranking_arrow():
+    pytest.importorskip("pyarrow")
+    table = to_arrow_table(ranked_builds(min_price=1, max_price=2))
+    assert table.num_rows == 0
+    assert table.column_names == EXPORT_COLUMNS
+
+
+def export(svc, body):
+    return asyncio.run(svc.handle_request("POST", "/export", json.dumps(body).encode()))
+
+
+@pytest.fixture
+def recommendation_service():
+    svc = service.RecommendationService(workers=1)
+    yield svc
+    svc.close_exports()
+    svc.executor.shutdown()
+
+
+def test_failed_reexport_keeps_previous_segment(recommendation_service, monkeypatch):
+    name = segment_name("reexport")
+    query = {"user_weights": USER_WEIGHTS, "limit": 5}
+    status, _content_type, report = export(recommendation_service, {**query, "shm": name})
+    assert status == 200 and report["rows"] == 5
+
+    def failing_publish(ranked_df, name):
+        raise RuntimeError("publish failed")
+
+    monkeypatch.setattr(service, "publish_builds", failing_publish)
+    with pytest.raises(RuntimeError):
+        export(recommendation_service, {**query, "limit": 3, "shm": name})
+    with SharedBuilds(name) as builds:
+        assert builds.rows == 5
+
+
+def test_foreign_segment_name_is_rejected(recommendation_service):
+    foreign = shared_memory.SharedMemory(name=segment_name("foreign"), create=True, size=16)
+    try:
+        with pytest.raises(ValueError):
+            export(recommendation_service, {"user_weights": USER_WEIGHTS, "shm": foreign.name})
+    finally:
+        foreign.close()
+        foreign.unlink()
+
+
+def test_empty_ranking_through_export(recommendation_service):
+    name = segment_name("empty_export")
+    status, _content_type, report = export(recommendation_service, {"user_weights": USER_WEIGHTS, "shm": name,
+                                                                    "min_price": 1, "max_price": 2})
+    assert status == 200 and report["rows"] == 0
+    with SharedBuilds(name) as builds:
+        assert builds.rows == 0